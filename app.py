@@ -1,14 +1,15 @@
 import logging
 import time
-from fastapi import FastAPI, Request, APIRouter, HTTPException, status
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, APIRouter, HTTPException, Query, status
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
 from fastapi.exceptions import RequestValidationError
-from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from typing import Any, List
+from typing import Any, List, Optional
 from datetime import datetime
+from dataclasses import asdict
 import uvicorn
 from app_config import app_settings
 from fastapi import FastAPI
@@ -18,7 +19,11 @@ from exceptions import (
     http_exception_handler,
     validation_exception_handler
 )
-from fusion.rental_listing.run_pipeline import run_pipeline
+from fusion.rental_listing.run_pipeline import arun_pipeline
+from fusion.rental_listing.transformation import PropertyTypeEnum
+from fusion.rental_listing.rentcast_client import rentcast_client
+from fusion.rental_listing.transformation_oper import TransformationOper
+from pipeline.metrics import pipeline_metrics
 from entities.abstracts.response_model import ResponseModel
 from entities.home_doc.api import api_router as home_doc_api_router
 from entities.residence.api import api_router as residence_api_router
@@ -26,8 +31,15 @@ from entities.residence.api import api_router as residence_api_router
 configure_logging()
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await rentcast_client.aclose()
+    TransformationOper.shutdown_process_pool()
+
 app = FastAPI(
     title="Fusion HomeDoc API",
+    lifespan=lifespan,
     openapi_tags=[
         {"name": "HomeDocsFusion", "description": "HomeDocs Fusion"},
         {"name": "HomeDocs", "description": "Basic HomeDocs management"},
@@ -65,10 +77,16 @@ async def home(request: Request):
     return templates.TemplateResponse("welcome.html", {"request": request})
 
 @api_router_fusion.get("/api/fuse", response_model=ResponseModel[List[Any]], tags=["HomeDocsFusion"])
-async def run_fusion():
+async def run_fusion(
+    property_types: List[PropertyTypeEnum] = Query([PropertyTypeEnum.single_family], alias="propertyType"),
+    chunk_size: Optional[int] = Query(None, alias="chunkSize", ge=1),
+    queue_size: Optional[int] = Query(None, alias="queueSize", ge=1),
+    profile: bool = Query(False),
+    pages: Optional[int] = Query(None, ge=1, le=50)
+):
     try:
         start_time = datetime.now()
-        res = await run_in_threadpool(run_pipeline, "Single Family")
+        res = await arun_pipeline([property_type.value for property_type in property_types], chunk_size, queue_size, profile, pages)
         end_time = datetime.now()
         duration = end_time - start_time
         logger.info(f"Pipeline completed in {duration.total_seconds()} seconds")
@@ -86,6 +104,23 @@ async def run_fusion():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve fused HomeDocs: {e}")
 
+@api_router_fusion.get("/api/fuse/metrics", response_model=ResponseModel[dict], tags=["HomeDocsFusion"])
+async def get_fusion_metrics(
+    runs: int = Query(20, ge=0, le=200)
+):
+    summary = pipeline_metrics.summary()
+    summary["recentRuns"] = [asdict(run) for run in pipeline_metrics.runs(runs)] if runs else []
+    summary["rentcastClient"] = rentcast_client.stats()
+    return ResponseModel(
+        message="Pipeline metrics retrieved successfully.",
+        data=summary,
+        status=status.HTTP_200_OK
+    )
+
+@api_router_fusion.get("/api/fuse/metrics/prometheus", response_class=PlainTextResponse, tags=["HomeDocsFusion"])
+async def get_fusion_metrics_prometheus():
+    return PlainTextResponse(pipeline_metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+
 app.include_router(api_router_fusion)
 app.include_router(home_doc_api_router)
 app.include_router(residence_api_router)
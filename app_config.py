@@ -4,6 +4,8 @@ from typing import List
 class Settings(BaseSettings):
     DEBUG: bool
     CORS_ORIGINS: List[str]
+    EXTERNAL_ID_MATCH_UNNEST_THRESHOLD: int = 1_000
+    EXTERNAL_ID_MATCH_TEMP_TABLE_THRESHOLD: int = 20_000
 
     model_config = SettingsConfigDict(
         env_file=".env",
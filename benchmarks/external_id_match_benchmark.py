@@ -0,0 +1,130 @@
+"""Latency benchmark for matching external ids against home_docs.
+
+Seeds the configured Postgres database with bare residences, then times every matching strategy
+(and the former single "IN (...)" query as a baseline) for batches of increasing size, half of
+whose ids exist.
+
+    python -m benchmarks.external_id_match_benchmark --sizes 100 1000 10000 100000 --repeat 5 --output match.json
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from sqlalchemy import text
+from sqlmodel import Session, select
+from db.session import engine
+from entities.home_doc.models import HomeDoc
+from entities.home_doc.external_id_matching import STRATEGIES, choose_strategy, match_external_ids
+
+logger = logging.getLogger(__name__)
+
+EXTERNAL_ID_PREFIX = "bench-match-"
+IN_BASELINE = "in"
+
+
+def seed(run_tag, count):
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                'INSERT INTO home_docs ("externalId", "interiorEntityKey", category, type) '
+                "SELECT :prefix || g, :prefix || 'key-' || g, 'ONE_STORY_HOUSE', 'PROPERTY' "
+                "FROM generate_series(0, :count - 1) AS g"
+            ),
+            {"prefix": f"{EXTERNAL_ID_PREFIX}{run_tag}-", "count": count}
+        )
+        connection.execute(text("ANALYZE home_docs"))
+
+
+def cleanup(run_tag):
+    with engine.begin() as connection:
+        connection.execute(
+            text('DELETE FROM home_docs WHERE "externalId" LIKE :pattern'),
+            {"pattern": f"{EXTERNAL_ID_PREFIX}{run_tag}-%"}
+        )
+
+
+def batch_ids(run_tag, size, hit_ratio):
+    # Existing ids first, then ids that were never seeded
+    hits = int(size * hit_ratio)
+    prefix = f"{EXTERNAL_ID_PREFIX}{run_tag}-"
+    return [f"{prefix}{index}" for index in range(hits)] + [f"{prefix}missing-{index}" for index in range(size - hits)]
+
+
+def match(external_ids, strategy):
+    with Session(engine) as session:
+        if strategy == IN_BASELINE:
+            statement = select(HomeDoc.id, HomeDoc.external_id).where(HomeDoc.external_id.in_(external_ids))
+            return session.exec(statement).all()
+        return match_external_ids(external_ids, session, strategy)
+
+
+def benchmark_size(run_tag, size, hit_ratio, strategies, repeat):
+    external_ids = batch_ids(run_tag, size, hit_ratio)
+    report = {"size": size, "chosenStrategy": choose_strategy(size), "strategies": {}}
+
+    for strategy in strategies:
+        durations = []
+        matched = None
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                matched = len(match(external_ids, strategy))
+                durations.append(time.perf_counter() - start)
+        except Exception as e:
+            # The IN baseline runs out of bind parameters on the largest batches
+            error = str(e).splitlines()[0]
+            logger.warning(f"{strategy} failed for {size} ids: {error}")
+            report["strategies"][strategy] = {"error": error}
+            continue
+
+        report["strategies"][strategy] = {
+            "matched": matched,
+            "median": statistics.median(durations),
+            "min": min(durations),
+            "max": max(durations),
+        }
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark external id matching strategies.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--hit-ratio", type=float, default=0.5, help="share of ids in each batch that exist")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--strategies", nargs="+", default=[IN_BASELINE, *STRATEGIES], choices=[IN_BASELINE, *STRATEGIES])
+    parser.add_argument("--keep-rows", action="store_true", help="do not delete the seeded residences afterwards")
+    parser.add_argument("--output", type=Path, default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    run_tag = str(int(time.time()))
+    report = {
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "hitRatio": args.hit_ratio,
+        "repeat": args.repeat,
+    }
+
+    try:
+        seed(run_tag, int(max(args.sizes) * args.hit_ratio))
+        report["results"] = [
+            benchmark_size(run_tag, size, args.hit_ratio, args.strategies, args.repeat) for size in args.sizes
+        ]
+    finally:
+        if not args.keep_rows:
+            cleanup(run_tag)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
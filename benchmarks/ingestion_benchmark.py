@@ -0,0 +1,256 @@
+"""Synthetic-scale benchmark for the rental-listing ingestion chain.
+
+Runs the real TransformationOper -> FusionOper -> ModifyBatch(ModifyOper) stages
+against the configured Postgres database, with the RentCast fetch replaced by
+listings generated from fusion/rental_listing/api_example.json, or with a corpus of RentCast
+responses recorded through RENTCAST_RECORD_DIR.
+
+    python -m benchmarks.ingestion_benchmark --scales 1000 10000 --update-ratio 0.5 --output bench.json
+    python -m benchmarks.ingestion_benchmark --replay .rentcast_recordings --property-type "Single Family"
+"""
+import argparse
+import copy
+import json
+import logging
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from sqlalchemy import text
+from db.session import engine
+from pipeline.operation import Operation
+from fusion.rental_listing.transformation_oper import TransformationOper
+from fusion.rental_listing.fusion_oper import FusionOper
+from fusion.rental_listing.modify_batch import ModifyBatch
+from fusion.rental_listing.modify_oper import ModifyOper
+from fusion.rental_listing.payload_archive import PayloadArchive
+
+logger = logging.getLogger(__name__)
+
+API_EXAMPLE_PATH = Path(__file__).resolve().parents[1] / "fusion" / "rental_listing" / "api_example.json"
+EXTERNAL_ID_PREFIX = "bench-"
+
+
+class SyntheticFetchOper(Operation):
+    def __init__(self, listings):
+        super().__init__()
+        self._listings = listings
+
+    def run(self, input=None):
+        return self._listings
+
+
+class ListingGenerator:
+    def __init__(self, history_length=5, contact_ratio=0.0, contacts_pool=50, seed=0):
+        with open(API_EXAMPLE_PATH, "r") as api_example_file:
+            self._templates = json.load(api_example_file)
+        self._history_length = history_length
+        self._contact_ratio = contact_ratio
+        self._contacts_pool = contacts_pool
+        self._random = random.Random(seed)
+
+    def generate(self, count, run_tag, offset=0):
+        return [self.listing(index, run_tag) for index in range(offset, offset + count)]
+
+    def listing(self, index, run_tag, price_shift=0.0):
+        listing = copy.deepcopy(self._templates[index % len(self._templates)])
+        listing["id"] = f"{EXTERNAL_ID_PREFIX}{run_tag}-{index}"
+        listing["formattedAddress"] = f"{index} Benchmark Ave, {run_tag}, FL 33404"
+        listing["price"] = round((listing.get("price") or 1000) * (1 + price_shift) + self._random.randint(0, 500), 2)
+        listing["history"] = self._history(listing["price"])
+
+        if self._random.random() < self._contact_ratio:
+            listing["listingAgent"] = self._contact("Agent", self._random.randrange(self._contacts_pool))
+            listing["listingOffice"] = self._contact("Office", self._random.randrange(self._contacts_pool))
+        else:
+            listing.pop("listingAgent", None)
+            listing.pop("listingOffice", None)
+
+        return listing
+
+    def mutate(self, listings, run_tag):
+        return [
+            self.listing(int(listing["id"].rsplit("-", 1)[1]), run_tag, price_shift=0.05)
+            for listing in listings
+        ]
+
+    def _contact(self, kind, number):
+        return {
+            "name": f"Benchmark {kind} {number}",
+            "phone": f"+1-555-{number:07d}",
+            "email": f"{kind.lower()}{number}@benchmark.example.com",
+            "website": f"https://benchmark.example.com/{kind.lower()}/{number}",
+        }
+
+    def _history(self, price):
+        history = {}
+        listed = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for _ in range(self._history_length):
+            removed = listed + timedelta(days=self._random.randint(1, 30))
+            history[listed.date().isoformat()] = {
+                "event": "Rental Listing",
+                "price": price,
+                "listingType": "Standard",
+                "listedDate": listed.isoformat(),
+                "removedDate": removed.isoformat(),
+                "daysOnMarket": (removed - listed).days,
+            }
+            listed = removed + timedelta(days=self._random.randint(1, 30))
+        return history
+
+
+def _rss_mb():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def run_chain(listings, trace_memory=False, bulk=False, copy_threshold=0):
+    operations = [
+        SyntheticFetchOper(listings),
+        TransformationOper(),
+        FusionOper(),
+        ModifyBatch(ModifyOper(), bulk=bulk, copy_threshold=copy_threshold),
+    ]
+
+    phases = []
+    context = dict()
+    cur = None
+    for operation in operations:
+        operation.set_context(context)
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        cur = operation.run(cur)
+        duration = time.perf_counter() - start
+        peak = None
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        context = operation.get_context()
+
+        op_name = operation.__class__.__name__
+        elements = len(cur)
+        phases.append({
+            "operation": op_name,
+            "duration": duration,
+            "elements": elements,
+            "throughput": elements / duration if duration > 0 else None,
+            "peakTracedMb": peak / (1024 * 1024) if peak is not None else None,
+            "maxRssMb": _rss_mb(),
+            "subphases": context.get(f"{op_name}_subphases"),
+        })
+
+    return phases
+
+
+def cleanup(run_tag):
+    with engine.begin() as connection:
+        connection.execute(
+            text('DELETE FROM home_docs WHERE "externalId" LIKE :pattern'),
+            {"pattern": f"{EXTERNAL_ID_PREFIX}{run_tag}-%"}
+        )
+
+
+def benchmark_scale(generator, scale, update_ratio, keep_rows, trace_memory, bulk, copy_threshold):
+    run_tag = f"{scale}-{int(time.time())}"
+    update_count = int(scale * update_ratio)
+    report = {"scale": scale, "updateRatio": update_ratio, "bulk": bulk, "copyThreshold": copy_threshold, "runTag": run_tag}
+
+    try:
+        seeded = generator.generate(update_count, run_tag)
+        if seeded:
+            seed_start = time.perf_counter()
+            run_chain(seeded, bulk=bulk, copy_threshold=copy_threshold)
+            report["seedDuration"] = time.perf_counter() - seed_start
+
+        listings = generator.mutate(seeded, run_tag) + generator.generate(scale - update_count, run_tag, offset=update_count)
+        start = time.perf_counter()
+        report["phases"] = run_chain(listings, trace_memory, bulk, copy_threshold)
+        report["duration"] = time.perf_counter() - start
+        report["throughput"] = scale / report["duration"] if report["duration"] > 0 else None
+    finally:
+        if not keep_rows:
+            cleanup(run_tag)
+
+    return report
+
+
+def benchmark_replay(archive_dir, property_type, keep_rows, trace_memory, bulk, copy_threshold):
+    run_tag = f"replay-{int(time.time())}"
+    archive = PayloadArchive(archive_dir)
+    entries = archive.entries(property_type)
+    listings = []
+    for listing in archive.iter_listings(entries):
+        # Recorded listings carry real RentCast ids, so they are namespaced to keep them apart from live rows
+        listing["id"] = f"{EXTERNAL_ID_PREFIX}{run_tag}-{listing['id']}"
+        listings.append(listing)
+    report = {
+        "replay": str(archive_dir),
+        "propertyType": property_type,
+        "pages": len(entries),
+        "scale": len(listings),
+        "bulk": bulk,
+        "copyThreshold": copy_threshold,
+        "runTag": run_tag,
+    }
+
+    try:
+        start = time.perf_counter()
+        report["phases"] = run_chain(listings, trace_memory, bulk, copy_threshold)
+        report["duration"] = time.perf_counter() - start
+        report["throughput"] = len(listings) / report["duration"] if report["duration"] > 0 else None
+    finally:
+        if not keep_rows:
+            cleanup(run_tag)
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the rental-listing ingestion chain on synthetic data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--update-ratio", type=float, default=0.5, help="share of listings that match existing residences")
+    parser.add_argument("--history-length", type=int, default=5)
+    parser.add_argument("--contact-ratio", type=float, default=0.0, help="share of listings with agent/office contacts")
+    parser.add_argument("--contacts-pool", type=int, default=50, help="number of distinct agents/offices")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="record tracemalloc peaks per phase (slows the run down)")
+    parser.add_argument("--bulk", action="store_true", help="write with the set-based bulk engine instead of the ORM")
+    parser.add_argument("--copy-threshold", type=int, default=0, help="with --bulk, load batches of at least this many rows through COPY")
+    parser.add_argument("--keep-rows", action="store_true", help="do not delete the generated residences afterwards")
+    parser.add_argument("--replay", type=Path, default=None, help="benchmark a recorded RentCast corpus instead of synthetic listings")
+    parser.add_argument("--property-type", default=None, help="only replay pages recorded for this property type")
+    parser.add_argument("--output", type=Path, default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    generator = ListingGenerator(args.history_length, args.contact_ratio, args.contacts_pool, args.seed)
+
+    report = {
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "historyLength": args.history_length,
+        "contactRatio": args.contact_ratio,
+    }
+    if args.replay:
+        report["results"] = [benchmark_replay(args.replay, args.property_type, args.keep_rows, args.trace_memory, args.bulk, args.copy_threshold)]
+    else:
+        report["results"] = [
+            benchmark_scale(generator, scale, args.update_ratio, args.keep_rows, args.trace_memory, args.bulk, args.copy_threshold)
+            for scale in args.scales
+        ]
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ class Settings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
+    POSTGRES_SSLMODE: str = "require"
 
     model_config = SettingsConfigDict(
         env_file = ".env",
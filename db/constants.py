@@ -47,3 +47,16 @@ def update_row_by_id(table_name: str, data: dict, row_id: int):
     except psycopg.Error as e:
         logger.error(f"Failed to update row in {table_name}: {e}")
         raise
+
+
+def execute_returning(query: str, params: Optional[list | tuple | dict] = None) -> Optional[dict[str, Any]]:
+    try:
+        with _get_db() as conn:
+            with conn.cursor(row_factory=psycopg.rows.dict_row) as cur:
+                cur.execute(query, params or ())
+                row = cur.fetchone() if cur.description else None
+            conn.commit()
+            return row
+    except psycopg.Error as e:
+        logger.error(f"Query failed: {e}")
+        raise
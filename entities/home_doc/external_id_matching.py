@@ -0,0 +1,77 @@
+import logging
+from typing import Dict, List, Optional
+from sqlalchemy import String, any_, bindparam, column, func, table, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import Session, select
+from app_config import app_settings
+from entities.home_doc.models import HomeDoc
+
+logger = logging.getLogger(__name__)
+
+ANY_STRATEGY = "any"
+UNNEST_STRATEGY = "unnest"
+TEMP_TABLE_STRATEGY = "temp_table"
+STRATEGIES = (ANY_STRATEGY, UNNEST_STRATEGY, TEMP_TABLE_STRATEGY)
+
+MATCH_TABLE = "external_id_matches"
+
+
+def choose_strategy(count: int) -> str:
+    # Every strategy sends the ids as a single parameter or a COPY stream, never one bind parameter per id:
+    # "= ANY" lets small batches probe the externalId index, unnest gives the planner a relation to hash
+    # join against, and past that a temp table is analyzed so the join is planned on real statistics.
+    if count <= app_settings.EXTERNAL_ID_MATCH_UNNEST_THRESHOLD:
+        return ANY_STRATEGY
+    if count <= app_settings.EXTERNAL_ID_MATCH_TEMP_TABLE_THRESHOLD:
+        return UNNEST_STRATEGY
+    return TEMP_TABLE_STRATEGY
+
+
+def match_external_ids(external_ids: List[str], session: Session, strategy: Optional[str] = None) -> List:
+    # Returns (id, external_id, source_fingerprint) rows for the residences matching the given external ids
+    external_ids = list(dict.fromkeys(external_id for external_id in external_ids if external_id))
+    if not external_ids:
+        return []
+
+    strategy = strategy or choose_strategy(len(external_ids))
+    columns = (HomeDoc.id, HomeDoc.external_id, HomeDoc.source_fingerprint)
+    if strategy == ANY_STRATEGY:
+        statement = select(*columns).where(HomeDoc.external_id == any_(_ids_param(external_ids)))
+    elif strategy == UNNEST_STRATEGY:
+        ids = select(func.unnest(_ids_param(external_ids)).label("external_id")).subquery()
+        statement = select(*columns).join(ids, HomeDoc.external_id == ids.c.external_id)
+    elif strategy == TEMP_TABLE_STRATEGY:
+        _load_match_table(external_ids, session)
+        ids = table(MATCH_TABLE, column("external_id"))
+        statement = select(*columns).join(ids, HomeDoc.external_id == ids.c.external_id)
+    else:
+        raise ValueError(f"Unknown external id matching strategy: {strategy}, expected one of {STRATEGIES}")
+
+    output = session.exec(statement).all()
+    logger.debug(f"Matched {len(output)} of {len(external_ids)} external ids using {strategy}")
+    return output
+
+
+def match_ids_by_external_ids(external_ids: List[str], session: Session, strategy: Optional[str] = None) -> Dict[str, int]:
+    output = {row.external_id: row.id for row in match_external_ids(external_ids, session, strategy)}
+    return output
+
+
+def _ids_param(external_ids):
+    return bindparam("external_ids", external_ids, type_=ARRAY(String))
+
+
+def _load_match_table(external_ids, session):
+    # The temp table lives as long as the connection and is emptied at every commit, so pooled
+    # connections reuse it; it is truncated first in case the current transaction already filled it.
+    connection = session.connection()
+    connection.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {MATCH_TABLE} (external_id text NOT NULL) ON COMMIT DELETE ROWS"
+    ))
+    connection.execute(text(f"TRUNCATE {MATCH_TABLE}"))
+
+    with connection.connection.driver_connection.cursor() as cursor:
+        with cursor.copy(f"COPY {MATCH_TABLE} (external_id) FROM STDIN") as copy:
+            for external_id in external_ids:
+                copy.write_row((external_id,))
+    connection.execute(text(f"ANALYZE {MATCH_TABLE}"))
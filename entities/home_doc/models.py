@@ -22,9 +22,15 @@ class HomeDoc(CamelModel, table=True):
     external_id: Optional[str] = Field(
         default=None,
         index=True,
+        unique=True,
         alias="externalId",
         sa_column_kwargs={"name": "externalId"}
     )
+    source_fingerprint: Optional[str] = Field(
+        default=None,
+        alias="sourceFingerprint",
+        sa_column_kwargs={"name": "sourceFingerprint"}
+    )
     interior_entity_key: str = Field(
         nullable=False,
         unique=True,
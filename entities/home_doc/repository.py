@@ -1,6 +1,7 @@
 from sqlmodel import Session, select
 from entities.abstracts.single_entity_repository import SingleEntityRepository
 from entities.home_doc.models import HomeDoc
+from entities.home_doc.external_id_matching import match_ids_by_external_ids
 from entities.utils.decorators import singleton
 from entities.utils.single_table_features import SingleTableFeatures
 from typing import List, Optional, Dict, Any
@@ -44,6 +45,7 @@ class HomeDocRepository(SingleEntityRepository[HomeDoc]):
         return data
 
     def update(self, home_doc: HomeDoc, session: Session, auto_commit: bool = True) -> HomeDoc:
+        home_doc.source_fingerprint = None
         session.add(home_doc)
         if auto_commit:
             session.commit()
@@ -64,7 +66,4 @@ class HomeDocRepository(SingleEntityRepository[HomeDoc]):
                 session.flush()
 
     def get_ids_by_external_ids(self, external_ids: List[str], session: Session) -> Dict[str, int]:
-        statement = select(HomeDoc.id, HomeDoc.external_id).where(HomeDoc.external_id.in_(external_ids))
-        results = session.exec(statement)
-
-        return {result.external_id: result.id for result in results}
\ No newline at end of file
+        return match_ids_by_external_ids(external_ids, session)
\ No newline at end of file
@@ -0,0 +1,399 @@
+# Set-based statements behind ResidenceRepository.bulk_upsert. Every column travels as one array
+# parameter and is unnested server side, so a statement costs the same number of bind parameters
+# whatever the batch size.
+
+INSERT_HOME_DOCS_QUERY = """
+    INSERT INTO home_docs (
+        "externalId", "interiorEntityKey", category, type, description, "extraData", "sourceFingerprint",
+        "listingAgentId", "listingOfficeId"
+    )
+    SELECT * FROM unnest(
+        CAST(:external_id AS varchar[]),
+        CAST(:interior_entity_key AS varchar[]),
+        CAST(:category AS home_doc_category_enum[]),
+        CAST(:type AS home_doc_type_enum[]),
+        CAST(:description AS varchar[]),
+        CAST(:extra_data AS json[]),
+        CAST(:source_fingerprint AS varchar[]),
+        CAST(:listing_agent_id AS integer[]),
+        CAST(:listing_office_id AS integer[])
+    )
+    ON CONFLICT ("externalId") DO UPDATE SET
+        description = EXCLUDED.description,
+        "extraData" = EXCLUDED."extraData",
+        "sourceFingerprint" = EXCLUDED."sourceFingerprint",
+        "listingAgentId" = COALESCE(EXCLUDED."listingAgentId", home_docs."listingAgentId"),
+        "listingOfficeId" = COALESCE(EXCLUDED."listingOfficeId", home_docs."listingOfficeId")
+    WHERE home_docs.type = ANY(CAST(:types AS home_doc_type_enum[]))
+    RETURNING id, "externalId", (xmax = 0) AS inserted
+"""
+
+UPDATE_HOME_DOCS_QUERY = """
+    UPDATE home_docs SET
+        "externalId" = data.external_id,
+        description = data.description,
+        "extraData" = data.extra_data,
+        "sourceFingerprint" = data.source_fingerprint,
+        "listingAgentId" = COALESCE(data.listing_agent_id, home_docs."listingAgentId"),
+        "listingOfficeId" = COALESCE(data.listing_office_id, home_docs."listingOfficeId")
+    FROM unnest(
+        CAST(:id AS integer[]),
+        CAST(:external_id AS varchar[]),
+        CAST(:description AS varchar[]),
+        CAST(:extra_data AS json[]),
+        CAST(:source_fingerprint AS varchar[]),
+        CAST(:listing_agent_id AS integer[]),
+        CAST(:listing_office_id AS integer[])
+    ) AS data(id, external_id, description, extra_data, source_fingerprint, listing_agent_id, listing_office_id)
+    WHERE home_docs.id = data.id AND home_docs.type = ANY(CAST(:types AS home_doc_type_enum[]))
+    RETURNING home_docs.id, home_docs."externalId"
+"""
+
+# One-to-one tables have no unique key on their parent id, so each is written with an update of
+# the rows that exist followed by an insert of the ones that do not, in a single statement. The
+# parent ids are never NULL, so NOT IN is safe and runs as a hashed subplan; NOT EXISTS against
+# the CTE got planned as a nested loop.
+UPSERT_SPECS_QUERY = """
+    WITH data AS (
+        SELECT * FROM unnest(
+            CAST(:home_doc_id AS integer[]),
+            CAST(:area AS double precision[]),
+            CAST(:sub_entities_quantity AS integer[]),
+            CAST(:construction_year AS integer[])
+        ) AS data(home_doc_id, area, sub_entities_quantity, construction_year)
+    ), updated AS (
+        UPDATE residence_specs_attributes AS specs SET
+            area = data.area,
+            "subEntitiesQuantity" = data.sub_entities_quantity,
+            "constructionYear" = data.construction_year
+        FROM data
+        WHERE specs."homeDocId" = data.home_doc_id
+        RETURNING specs."homeDocId"
+    )
+    INSERT INTO residence_specs_attributes ("homeDocId", area, "subEntitiesQuantity", "constructionYear")
+    SELECT data.home_doc_id, data.area, data.sub_entities_quantity, data.construction_year
+    FROM data
+    WHERE data.home_doc_id NOT IN (SELECT updated."homeDocId" FROM updated)
+"""
+
+UPSERT_DIMENSIONS_QUERY = """
+    WITH data AS (
+        SELECT * FROM unnest(
+            CAST(:home_doc_id AS integer[]),
+            CAST(:length AS double precision[]),
+            CAST(:width AS double precision[])
+        ) AS data(home_doc_id, length, width)
+    ), updated AS (
+        UPDATE home_docs_dimensions AS dimensions SET
+            length = data.length,
+            width = data.width
+        FROM data
+        WHERE dimensions."homeDocId" = data.home_doc_id
+        RETURNING dimensions."homeDocId"
+    )
+    INSERT INTO home_docs_dimensions ("homeDocId", length, width)
+    SELECT data.home_doc_id, data.length, data.width
+    FROM data
+    WHERE data.home_doc_id NOT IN (SELECT updated."homeDocId" FROM updated)
+"""
+
+UPSERT_LISTINGS_QUERY = """
+    WITH data AS (
+        SELECT * FROM unnest(
+            CAST(:residence_id AS integer[]),
+            CAST(:price AS double precision[]),
+            CAST(:hoa_fee AS double precision[]),
+            CAST(:bedrooms AS double precision[]),
+            CAST(:bathrooms AS double precision[]),
+            CAST(:listing_status AS listing_status_enum[])
+        ) AS data(residence_id, price, hoa_fee, bedrooms, bathrooms, listing_status)
+    ), updated AS (
+        UPDATE listings SET
+            price = data.price,
+            "hoaFee" = data.hoa_fee,
+            bedrooms = data.bedrooms,
+            bathrooms = data.bathrooms,
+            "listingStatus" = data.listing_status
+        FROM data
+        WHERE listings."residenceId" = data.residence_id
+        RETURNING listings."residenceId"
+    )
+    INSERT INTO listings ("residenceId", price, "hoaFee", bedrooms, bathrooms, "listingStatus")
+    SELECT data.residence_id, data.price, data.hoa_fee, data.bedrooms, data.bathrooms, data.listing_status
+    FROM data
+    WHERE data.residence_id NOT IN (SELECT updated."residenceId" FROM updated)
+"""
+
+DELETE_HISTORY_QUERY = """
+    DELETE FROM listing_history WHERE "residenceId" = ANY(CAST(:residence_id AS integer[]))
+"""
+
+INSERT_HISTORY_QUERY = """
+    INSERT INTO listing_history (event, price, "listingType", "listedDate", "removedDate", "daysOnMarket", "residenceId")
+    SELECT * FROM unnest(
+        CAST(:event AS varchar[]),
+        CAST(:price AS double precision[]),
+        CAST(:listing_type AS listing_type_enum[]),
+        CAST(:listed_date AS timestamp[]),
+        CAST(:removed_date AS timestamp[]),
+        CAST(:days_on_market AS integer[]),
+        CAST(:residence_id AS integer[])
+    )
+"""
+
+# COPY based load (ResidenceRepository.copy_upsert): rows are streamed into per-connection temp tables,
+# emptied at commit, and merged into the residence tables from there with set-based statements.
+STAGING_RESIDENCES_TABLE = "staging_residences"
+STAGING_HISTORY_TABLE = "staging_listing_history"
+
+STAGING_RESIDENCE_COLUMNS = (
+    "residence_id", "external_id", "interior_entity_key", "category", "type", "description",
+    "extra_data", "source_fingerprint", "area", "sub_entities_quantity", "construction_year", "length", "width",
+    "price", "hoa_fee", "bedrooms", "bathrooms", "listing_status",
+    "agent_name", "agent_phone", "agent_email", "agent_website",
+    "office_name", "office_phone", "office_email", "office_website",
+)
+STAGING_HISTORY_COLUMNS = (
+    "external_id", "event", "price", "listing_type", "listed_date", "removed_date", "days_on_market",
+)
+
+CREATE_STAGING_TABLES_QUERIES = (
+    f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGING_RESIDENCES_TABLE} (
+        residence_id integer,
+        external_id text NOT NULL,
+        interior_entity_key text,
+        category text,
+        type text,
+        description text,
+        extra_data json,
+        source_fingerprint text,
+        area double precision,
+        sub_entities_quantity integer,
+        construction_year integer,
+        length double precision,
+        width double precision,
+        price double precision,
+        hoa_fee double precision,
+        bedrooms double precision,
+        bathrooms double precision,
+        listing_status text,
+        agent_name text,
+        agent_phone text,
+        agent_email text,
+        agent_website text,
+        office_name text,
+        office_phone text,
+        office_email text,
+        office_website text,
+        agent_id integer,
+        office_id integer,
+        home_doc_id integer
+    ) ON COMMIT DELETE ROWS
+    """,
+    f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGING_HISTORY_TABLE} (
+        external_id text NOT NULL,
+        event text,
+        price double precision,
+        listing_type text,
+        listed_date timestamptz,
+        removed_date timestamptz,
+        days_on_market integer
+    ) ON COMMIT DELETE ROWS
+    """,
+    f"""
+    TRUNCATE {STAGING_RESIDENCES_TABLE}, {STAGING_HISTORY_TABLE}
+    """,
+)
+
+# Only identities not stored yet are inserted: the unique constraint treats NULLs as distinct, so
+# ON CONFLICT alone would add a new row for every contact missing a phone or an email.
+MERGE_CONTACTS_QUERIES = (
+    f"""
+    WITH contacts AS (
+        SELECT DISTINCT ON (name, phone, email) name, phone, email, website
+        FROM (
+            SELECT agent_name AS name, agent_phone AS phone, agent_email AS email, agent_website AS website
+            FROM {STAGING_RESIDENCES_TABLE}
+            UNION ALL
+            SELECT office_name, office_phone, office_email, office_website
+            FROM {STAGING_RESIDENCES_TABLE}
+        ) AS staged
+        WHERE name IS NOT NULL
+        ORDER BY name, phone, email
+    )
+    INSERT INTO listing_contact (name, phone, email, website)
+    SELECT contacts.name, contacts.phone, contacts.email, contacts.website
+    FROM contacts
+    WHERE NOT EXISTS (
+        SELECT 1 FROM listing_contact
+        WHERE listing_contact.name = contacts.name
+        AND listing_contact.phone IS NOT DISTINCT FROM contacts.phone
+        AND listing_contact.email IS NOT DISTINCT FROM contacts.email
+    )
+    ON CONFLICT (name, phone, email) DO NOTHING
+    """,
+    f"""
+    UPDATE {STAGING_RESIDENCES_TABLE} AS staged SET
+        agent_id = (
+            SELECT min(listing_contact.id) FROM listing_contact
+            WHERE listing_contact.name = staged.agent_name
+            AND listing_contact.phone IS NOT DISTINCT FROM staged.agent_phone
+            AND listing_contact.email IS NOT DISTINCT FROM staged.agent_email
+        ),
+        office_id = (
+            SELECT min(listing_contact.id) FROM listing_contact
+            WHERE listing_contact.name = staged.office_name
+            AND listing_contact.phone IS NOT DISTINCT FROM staged.office_phone
+            AND listing_contact.email IS NOT DISTINCT FROM staged.office_email
+        )
+    WHERE staged.agent_name IS NOT NULL OR staged.office_name IS NOT NULL
+    """,
+)
+
+MERGE_HOME_DOCS_QUERIES = (
+    f"""
+    INSERT INTO home_docs (
+        "externalId", "interiorEntityKey", category, type, description, "extraData", "sourceFingerprint",
+        "listingAgentId", "listingOfficeId"
+    )
+    SELECT
+        external_id, interior_entity_key, CAST(category AS home_doc_category_enum), CAST(type AS home_doc_type_enum),
+        description, extra_data, source_fingerprint, agent_id, office_id
+    FROM {STAGING_RESIDENCES_TABLE}
+    WHERE residence_id IS NULL
+    ON CONFLICT ("externalId") DO UPDATE SET
+        description = EXCLUDED.description,
+        "extraData" = EXCLUDED."extraData",
+        "sourceFingerprint" = EXCLUDED."sourceFingerprint",
+        "listingAgentId" = COALESCE(EXCLUDED."listingAgentId", home_docs."listingAgentId"),
+        "listingOfficeId" = COALESCE(EXCLUDED."listingOfficeId", home_docs."listingOfficeId")
+    WHERE home_docs.type = ANY(CAST(%(types)s AS home_doc_type_enum[]))
+    """,
+    f"""
+    UPDATE home_docs SET
+        "externalId" = staged.external_id,
+        description = staged.description,
+        "extraData" = staged.extra_data,
+        "sourceFingerprint" = staged.source_fingerprint,
+        "listingAgentId" = COALESCE(staged.agent_id, home_docs."listingAgentId"),
+        "listingOfficeId" = COALESCE(staged.office_id, home_docs."listingOfficeId")
+    FROM {STAGING_RESIDENCES_TABLE} AS staged
+    WHERE home_docs.id = staged.residence_id AND home_docs.type = ANY(CAST(%(types)s AS home_doc_type_enum[]))
+    """,
+    f"""
+    UPDATE {STAGING_RESIDENCES_TABLE} AS staged SET home_doc_id = home_docs.id
+    FROM home_docs
+    WHERE home_docs."externalId" = staged.external_id
+    AND (staged.residence_id IS NULL OR staged.residence_id = home_docs.id)
+    AND home_docs.type = ANY(CAST(%(types)s AS home_doc_type_enum[]))
+    """,
+)
+
+MERGE_DETAILS_QUERIES = (
+    f"""
+    WITH updated AS (
+        UPDATE residence_specs_attributes AS specs SET
+            area = staged.area,
+            "subEntitiesQuantity" = staged.sub_entities_quantity,
+            "constructionYear" = staged.construction_year
+        FROM {STAGING_RESIDENCES_TABLE} AS staged
+        WHERE specs."homeDocId" = staged.home_doc_id
+        RETURNING specs."homeDocId"
+    )
+    INSERT INTO residence_specs_attributes ("homeDocId", area, "subEntitiesQuantity", "constructionYear")
+    SELECT staged.home_doc_id, staged.area, staged.sub_entities_quantity, staged.construction_year
+    FROM {STAGING_RESIDENCES_TABLE} AS staged
+    WHERE staged.home_doc_id IS NOT NULL
+    AND staged.home_doc_id NOT IN (SELECT updated."homeDocId" FROM updated)
+    """,
+    f"""
+    WITH updated AS (
+        UPDATE home_docs_dimensions AS dimensions SET
+            length = staged.length,
+            width = staged.width
+        FROM {STAGING_RESIDENCES_TABLE} AS staged
+        WHERE dimensions."homeDocId" = staged.home_doc_id
+        RETURNING dimensions."homeDocId"
+    )
+    INSERT INTO home_docs_dimensions ("homeDocId", length, width)
+    SELECT staged.home_doc_id, staged.length, staged.width
+    FROM {STAGING_RESIDENCES_TABLE} AS staged
+    WHERE staged.home_doc_id IS NOT NULL
+    AND staged.home_doc_id NOT IN (SELECT updated."homeDocId" FROM updated)
+    """,
+    f"""
+    WITH updated AS (
+        UPDATE listings SET
+            price = staged.price,
+            "hoaFee" = staged.hoa_fee,
+            bedrooms = staged.bedrooms,
+            bathrooms = staged.bathrooms,
+            "listingStatus" = CAST(staged.listing_status AS listing_status_enum)
+        FROM {STAGING_RESIDENCES_TABLE} AS staged
+        WHERE listings."residenceId" = staged.home_doc_id
+        RETURNING listings."residenceId"
+    )
+    INSERT INTO listings ("residenceId", price, "hoaFee", bedrooms, bathrooms, "listingStatus")
+    SELECT
+        staged.home_doc_id, staged.price, staged.hoa_fee, staged.bedrooms, staged.bathrooms,
+        CAST(staged.listing_status AS listing_status_enum)
+    FROM {STAGING_RESIDENCES_TABLE} AS staged
+    WHERE staged.home_doc_id IS NOT NULL
+    AND staged.home_doc_id NOT IN (SELECT updated."residenceId" FROM updated)
+    """,
+    f"""
+    DELETE FROM listing_history
+    USING {STAGING_RESIDENCES_TABLE} AS staged
+    WHERE listing_history."residenceId" = staged.home_doc_id
+    """,
+    f"""
+    INSERT INTO listing_history (event, price, "listingType", "listedDate", "removedDate", "daysOnMarket", "residenceId")
+    SELECT
+        history.event, history.price, CAST(history.listing_type AS listing_type_enum),
+        history.listed_date, history.removed_date, history.days_on_market, staged.home_doc_id
+    FROM {STAGING_HISTORY_TABLE} AS history
+    JOIN {STAGING_RESIDENCES_TABLE} AS staged ON staged.external_id = history.external_id
+    WHERE staged.home_doc_id IS NOT NULL
+    """,
+)
+
+STAGED_IDS_QUERY = f"""
+    SELECT external_id, home_doc_id FROM {STAGING_RESIDENCES_TABLE} WHERE home_doc_id IS NOT NULL
+"""
+
+# Contact resolution (ResidenceRepository.resolve_contacts): one insert of the identities not stored
+# yet and one lookup of all of them. Matching uses IS NOT DISTINCT FROM because the unique constraint
+# treats NULLs as distinct, and the oldest row wins where duplicates were stored before.
+INSERT_CONTACTS_QUERY = """
+    INSERT INTO listing_contact (name, phone, email, website)
+    SELECT data.name, data.phone, data.email, data.website
+    FROM unnest(
+        CAST(:name AS varchar[]),
+        CAST(:phone AS varchar[]),
+        CAST(:email AS varchar[]),
+        CAST(:website AS varchar[])
+    ) AS data(name, phone, email, website)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM listing_contact
+        WHERE listing_contact.name = data.name
+        AND listing_contact.phone IS NOT DISTINCT FROM data.phone
+        AND listing_contact.email IS NOT DISTINCT FROM data.email
+    )
+    ON CONFLICT (name, phone, email) DO NOTHING
+"""
+
+SELECT_CONTACT_IDS_QUERY = """
+    SELECT data.name, data.phone, data.email, min(listing_contact.id) AS id
+    FROM unnest(
+        CAST(:name AS varchar[]),
+        CAST(:phone AS varchar[]),
+        CAST(:email AS varchar[])
+    ) AS data(name, phone, email)
+    JOIN listing_contact
+        ON listing_contact.name = data.name
+        AND listing_contact.phone IS NOT DISTINCT FROM data.phone
+        AND listing_contact.email IS NOT DISTINCT FROM data.email
+    GROUP BY data.name, data.phone, data.email
+"""
@@ -1,6 +1,8 @@
+import json
 from sqlmodel import Session,select
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from fastapi import HTTPException
+from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError
 from entities.abstracts.expanded_entity_repository import ExpandedEntityRepository
 from entities.abstracts.expanded_entity_repository import RelationshipConfig, RelationshipType, LoadStrategy
@@ -8,6 +10,13 @@ from entities.home_doc.models import HomeDoc, HomeDocDimensions
 from entities.residence.models import ResidenceSpecsAttributes, Listing, ListingHistory, ListingContact
 from entities.utils.multi_table_features import MultiTableFeatures
 from entities.common.enums import HomeDocTypeEnum
+from entities.residence.bulk_queries import (
+    INSERT_HOME_DOCS_QUERY, UPDATE_HOME_DOCS_QUERY, UPSERT_SPECS_QUERY, UPSERT_DIMENSIONS_QUERY,
+    UPSERT_LISTINGS_QUERY, DELETE_HISTORY_QUERY, INSERT_HISTORY_QUERY,
+    STAGING_RESIDENCES_TABLE, STAGING_HISTORY_TABLE, STAGING_RESIDENCE_COLUMNS, STAGING_HISTORY_COLUMNS,
+    CREATE_STAGING_TABLES_QUERIES, MERGE_CONTACTS_QUERIES, MERGE_HOME_DOCS_QUERIES, MERGE_DETAILS_QUERIES,
+    STAGED_IDS_QUERY, INSERT_CONTACTS_QUERY, SELECT_CONTACT_IDS_QUERY
+)
 from entities.utils.decorators import singleton
 
 @singleton
@@ -106,24 +115,21 @@ class ResidenceRepository(ExpandedEntityRepository[HomeDoc]):
                 for row in results
             ]
 
-    def create(self, data: Dict[str, Any], session: Session, auto_commit: bool = True, reload: bool = True) -> HomeDoc:
-        agent = None
-        office = None
+    def create(
+        self,
+        data: Dict[str, Any],
+        session: Session,
+        auto_commit: bool = True,
+        reload: bool = True,
+        contact_ids: Optional[Dict[Tuple, int]] = None,
+    ) -> HomeDoc:
+        agent_id = None
+        office_id = None
 
         if 'listing_agent' in data:
-            agent = self._create_or_get_many_to_one_relationship(
-                session,
-                ListingContact,
-                data['listing_agent'],
-                unique_fields=["name", "phone", "email"]
-            )
+            agent_id = self._resolve_contact_id(data['listing_agent'], session, contact_ids)
         if 'listing_office' in data:
-            office = self._create_or_get_many_to_one_relationship(
-                session,
-                ListingContact,
-                data['listing_office'],
-                unique_fields=["name", "phone", "email"]
-            )
+            office_id = self._resolve_contact_id(data['listing_office'], session, contact_ids)
 
         home_doc = HomeDoc(**{
             field_name: field_value
@@ -131,8 +137,8 @@ class ResidenceRepository(ExpandedEntityRepository[HomeDoc]):
             if field_name in HomeDoc.model_fields
             and field_name not in ['id', 'listing_agent_id', 'listing_office_id', 'listing_agent', 'listing_office', 'listing_history']
         })
-        home_doc.listing_agent_id = agent.id if agent else None
-        home_doc.listing_office_id = office.id if office else None
+        home_doc.listing_agent_id = agent_id
+        home_doc.listing_office_id = office_id
 
         specs = self._create_one_to_one_relationship(ResidenceSpecsAttributes,
                                                      data,
@@ -168,8 +174,15 @@ class ResidenceRepository(ExpandedEntityRepository[HomeDoc]):
         session: Session,
         auto_commit: bool = True,
         preloaded: Optional[HomeDoc] = None,
+        contact_ids: Optional[Dict[Tuple, int]] = None,
     ) -> HomeDoc:
         home_doc = preloaded or self.get_by_id(item_id, session)
+        if home_doc is None:
+            return None
+
+        if "source_fingerprint" not in data and home_doc.source_fingerprint is not None:
+            # Any other update may diverge from the source, so the next sync must write the listing again
+            home_doc.source_fingerprint = None
 
         home_doc_fields = set(HomeDoc.model_fields) - {'id', 'listing_agent', 'listing_office', 'listing_history'}
         for field_name, field_value in data.items():
@@ -180,22 +193,23 @@ class ResidenceRepository(ExpandedEntityRepository[HomeDoc]):
         self._update_one_to_one_relationship(home_doc.dimensions, data, {'id', 'home_doc_id'})
         self._update_one_to_one_relationship(home_doc.listing, data, {'id', 'residence_id'})
         
-        self._update_many_to_one_relationship(
-            primary_instance=home_doc,
-            relationship_field="listing_agent",
-            related_model_class=ListingContact,
-            data=data.get("listing_agent", {}),
-            excluded_fields={"id"},
-            session=session
-        )
-        self._update_many_to_one_relationship(
-            primary_instance=home_doc,
-            relationship_field="listing_office",
-            related_model_class=ListingContact,
-            data=data.get("listing_office", {}),
-            excluded_fields={"id"},
-            session=session
-        )
+        for relationship_field in ("listing_agent", "listing_office"):
+            contact = data.get(relationship_field)
+            if contact and "id" not in contact:
+                # A contact without an id is matched by identity like on create, instead of
+                # overwriting the contact row that other residences may share. Only the foreign key is
+                # set, so no contact row is loaded per residence.
+                setattr(home_doc, f"{relationship_field}_id", self._resolve_contact_id(contact, session, contact_ids))
+                session.expire(home_doc, [relationship_field])
+            else:
+                self._update_many_to_one_relationship(
+                    primary_instance=home_doc,
+                    relationship_field=relationship_field,
+                    related_model_class=ListingContact,
+                    data=contact or {},
+                    excluded_fields={"id"},
+                    session=session
+                )
 
         self._update_one_to_many_relationship(
             primary_instance=home_doc,
@@ -222,6 +236,186 @@ class ResidenceRepository(ExpandedEntityRepository[HomeDoc]):
 
         return home_doc
 
+    def bulk_upsert(
+        self,
+        rows: List[Tuple[Optional[int], Dict[str, Any]]],
+        session: Session,
+        contact_ids: Optional[Dict[Tuple, int]] = None,
+    ) -> List[Optional[int]]:
+        # Writes trusted rows (as produced by FusionOper) with a fixed number of set-based statements instead
+        # of one ORM object graph per residence. Returns the residence id of every row, None for update rows
+        # whose residence no longer exists and for create rows whose external id belongs to a home_doc that
+        # is not a residence. Nothing is committed; the caller owns the transaction.
+        latest = {}
+        for residence_id, row in rows:
+            # A listing repeated within the batch is written once, with its last version
+            latest[row["external_id"]] = (residence_id, row)
+        contact_ids = self.resolve_contacts(
+            [row.get(field) for _, row in latest.values() for field in ("listing_agent", "listing_office")],
+            session,
+            known=contact_ids
+        )
+
+        connection = session.connection()
+        types = [residence_type.value for residence_type in self.types]
+        ids_by_external_id = {}
+        inserted_ids = set()
+
+        creates = [row for residence_id, row in latest.values() if not residence_id]
+        if creates:
+            result = connection.execute(text(INSERT_HOME_DOCS_QUERY), {
+                **_home_doc_columns(creates, contact_ids),
+                "interior_entity_key": _column(creates, "interior_entity_key"),
+                "category": _column(creates, "category"),
+                "type": _column(creates, "type"),
+                "types": types,
+            })
+            for home_doc in result:
+                ids_by_external_id[home_doc.externalId] = home_doc.id
+                if home_doc.inserted:
+                    inserted_ids.add(home_doc.id)
+
+        updates = [(residence_id, row) for residence_id, row in latest.values() if residence_id]
+        if updates:
+            result = connection.execute(text(UPDATE_HOME_DOCS_QUERY), {
+                **_home_doc_columns([row for _, row in updates], contact_ids),
+                "id": [residence_id for residence_id, _ in updates],
+                "types": types,
+            })
+            ids_by_external_id.update({home_doc.externalId: home_doc.id for home_doc in result})
+
+        written = [(ids_by_external_id[external_id], row) for external_id, (_, row) in latest.items() if external_id in ids_by_external_id]
+        if written:
+            home_doc_ids = [home_doc_id for home_doc_id, _ in written]
+            written_rows = [row for _, row in written]
+            connection.execute(text(UPSERT_SPECS_QUERY), {
+                "home_doc_id": home_doc_ids,
+                "area": _column(written_rows, "area", float),
+                "sub_entities_quantity": _column(written_rows, "sub_entities_quantity", int),
+                "construction_year": _column(written_rows, "construction_year", int),
+            })
+            connection.execute(text(UPSERT_DIMENSIONS_QUERY), {
+                "home_doc_id": home_doc_ids,
+                "length": _column(written_rows, "length", float),
+                "width": _column(written_rows, "width", float),
+            })
+            connection.execute(text(UPSERT_LISTINGS_QUERY), {
+                "residence_id": home_doc_ids,
+                "price": _column(written_rows, "price", float),
+                "hoa_fee": _column(written_rows, "hoa_fee", float),
+                "bedrooms": _column(written_rows, "bedrooms", float),
+                "bathrooms": _column(written_rows, "bathrooms", float),
+                "listing_status": _column(written_rows, "listing_status"),
+            })
+            self._bulk_replace_history(written, inserted_ids, connection)
+
+        output = [ids_by_external_id.get(row["external_id"]) for _, row in rows]
+        return output
+
+    def copy_upsert(self, rows: List[Tuple[Optional[int], Dict[str, Any]]], session: Session) -> List[Optional[int]]:
+        # Same contract as bulk_upsert, for large batches: rows are streamed with COPY into temp staging
+        # tables and merged from there in the session's transaction, contacts included.
+        latest = {}
+        for residence_id, row in rows:
+            latest[row["external_id"]] = (residence_id, row)
+
+        connection = session.connection().connection.driver_connection
+        with connection.cursor() as cursor:
+            for query in CREATE_STAGING_TABLES_QUERIES:
+                cursor.execute(query)
+
+            with cursor.copy(f"COPY {STAGING_RESIDENCES_TABLE} ({', '.join(STAGING_RESIDENCE_COLUMNS)}) FROM STDIN") as copy:
+                for residence_id, row in latest.values():
+                    copy.write_row(_staging_residence(residence_id, row))
+            with cursor.copy(f"COPY {STAGING_HISTORY_TABLE} ({', '.join(STAGING_HISTORY_COLUMNS)}) FROM STDIN") as copy:
+                for _, row in latest.values():
+                    for item in row.get("listing_history") or []:
+                        copy.write_row((row["external_id"], *(item.get(column) for column in STAGING_HISTORY_COLUMNS[1:])))
+            cursor.execute(f"ANALYZE {STAGING_RESIDENCES_TABLE}")
+            cursor.execute(f"ANALYZE {STAGING_HISTORY_TABLE}")
+
+            types = [residence_type.value for residence_type in self.types]
+            for query in (*MERGE_CONTACTS_QUERIES, *MERGE_HOME_DOCS_QUERIES, *MERGE_DETAILS_QUERIES):
+                cursor.execute(query, {"types": types} if "%(types)s" in query else None)
+
+            cursor.execute(STAGED_IDS_QUERY)
+            ids_by_external_id = dict(cursor.fetchall())
+
+        output = [ids_by_external_id.get(row["external_id"]) for _, row in rows]
+        return output
+
+    def resolve_contacts(
+        self,
+        contacts: List[Optional[Dict[str, Any]]],
+        session: Session,
+        known: Optional[Dict[Tuple, int]] = None,
+    ) -> Dict[Tuple, int]:
+        # Maps the (name, phone, email) identity of every given contact to its row id with one multi-row
+        # insert and one lookup for the whole batch. Identities in `known` (resolved earlier in the same run)
+        # are not queried again.
+        known = known or {}
+        output = {}
+        pending = {}
+        for contact in contacts:
+            contact = _contact_data(contact)
+            if not _has_identity(contact):
+                continue
+            identity = _contact_identity(contact)
+            if identity in known:
+                output[identity] = known[identity]
+            else:
+                pending.setdefault(identity, contact)
+
+        if pending:
+            connection = session.connection()
+            values = list(pending.values())
+            identities = {
+                "name": _column(values, "name"),
+                "phone": _column(values, "phone"),
+                "email": _column(values, "email"),
+            }
+            connection.execute(text(INSERT_CONTACTS_QUERY), {**identities, "website": _column(values, "website")})
+            for contact in connection.execute(text(SELECT_CONTACT_IDS_QUERY), identities):
+                output[(contact.name, contact.phone, contact.email)] = contact.id
+
+        return output
+
+    def _resolve_contact_id(self, contact: Dict[str, Any], session: Session, contact_ids: Optional[Dict[Tuple, int]]) -> Optional[int]:
+        contact = _contact_data(contact)
+        if not _has_identity(contact):
+            return None
+        contact_id = (contact_ids or {}).get(_contact_identity(contact))
+        if contact_id is None:
+            contact_id = self._create_or_get_many_to_one_relationship(
+                session,
+                ListingContact,
+                contact,
+                unique_fields=["name", "phone", "email"]
+            ).id
+        return contact_id
+
+    def _bulk_replace_history(self, written, inserted_ids, connection) -> None:
+        # The source always sends a residence's full history, so it replaces the stored one
+        existing_ids = [home_doc_id for home_doc_id, _ in written if home_doc_id not in inserted_ids]
+        if existing_ids:
+            connection.execute(text(DELETE_HISTORY_QUERY), {"residence_id": existing_ids})
+
+        history = [
+            {**item, "residence_id": home_doc_id}
+            for home_doc_id, row in written
+            for item in row.get("listing_history") or []
+        ]
+        if history:
+            connection.execute(text(INSERT_HISTORY_QUERY), {
+                "event": _column(history, "event"),
+                "price": _column(history, "price", float),
+                "listing_type": _column(history, "listing_type"),
+                "listed_date": _column(history, "listed_date"),
+                "removed_date": _column(history, "removed_date"),
+                "days_on_market": _column(history, "days_on_market", int),
+                "residence_id": _column(history, "residence_id"),
+            })
+
     def delete(self, item_id: int, session: Session, auto_commit: bool = True) -> None:
         residence_filter = HomeDoc.type.in_(self.types)
         statement = select(self.primary_model).where(self.primary_model.id == item_id, residence_filter)
@@ -231,4 +425,59 @@ class ResidenceRepository(ExpandedEntityRepository[HomeDoc]):
             if auto_commit:
                 session.commit()
             else:
-                session.flush()
\ No newline at end of file
+                session.flush()
+
+def _column(rows, field, cast=None):
+    values = [row.get(field) for row in rows]
+    if cast is None:
+        return values
+    return [cast(value) if value is not None else None for value in values]
+
+
+def _contact_data(contact):
+    if not contact:
+        return None
+    return {field: value for field, value in contact.items() if value is not None and field != "id"}
+
+
+def _contact_identity(contact):
+    return (contact.get("name"), contact.get("phone"), contact.get("email"))
+
+
+def _has_identity(contact):
+    # Contacts are identified by name, phone and email and the name is required, so a nameless contact is
+    # not linked on any write path, the same as in the COPY merge
+    return bool(contact and contact.get("name"))
+
+
+def _contact_ids(rows, relationship_field, contact_ids):
+    output = []
+    for row in rows:
+        contact = _contact_data(row.get(relationship_field))
+        output.append(contact_ids[_contact_identity(contact)] if _has_identity(contact) else None)
+    return output
+
+
+def _home_doc_columns(rows, contact_ids):
+    output = {
+        "external_id": _column(rows, "external_id"),
+        "description": _column(rows, "description"),
+        "extra_data": [json.dumps(row.get("extra_data") or []) for row in rows],
+        "source_fingerprint": _column(rows, "source_fingerprint"),
+        "listing_agent_id": _contact_ids(rows, "listing_agent", contact_ids),
+        "listing_office_id": _contact_ids(rows, "listing_office", contact_ids),
+    }
+    return output
+
+
+def _staging_residence(residence_id, row):
+    agent = _contact_data(row.get("listing_agent")) or {}
+    office = _contact_data(row.get("listing_office")) or {}
+    values = {
+        **row,
+        "residence_id": residence_id,
+        "extra_data": json.dumps(row.get("extra_data") or []),
+        **{f"agent_{field}": value for field, value in agent.items()},
+        **{f"office_{field}": value for field, value in office.items()},
+    }
+    return tuple(values.get(column) for column in STAGING_RESIDENCE_COLUMNS)
@@ -1,7 +1,7 @@
 from sqlmodel import Session
 from sqlalchemy.exc import IntegrityError
 from entities.utils.decorators import singleton
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from entities.abstracts.service import Service
 from entities.residence.dtos import ResidenceResponse, ResidenceCreate, ResidenceUpdate
 from entities.residence.repository import ResidenceRepository
@@ -39,15 +39,17 @@ class ResidenceService(Service[ResidenceResponse, ResidenceRepository, Residence
 
     def create(
         self,
-        data: ResidenceCreate,
+        data: ResidenceCreate | Dict[str, Any],
         session: Session,
         auto_commit: bool = True,
         reload: bool = True,
+        contact_ids: Optional[Dict[Tuple, int]] = None,
     ) -> ResidenceResponse | HomeDoc:
         try:
-            residence_dict = data.model_dump(exclude_none=True)
+            # A plain dict is a trusted, already validated row (e.g. from the ingestion pipeline)
+            residence_dict = data if isinstance(data, dict) else data.model_dump(exclude_none=True)
             self._validate_entity(residence_dict)
-            home_doc = self.repo.create(residence_dict, session, auto_commit=auto_commit, reload=reload)
+            home_doc = self.repo.create(residence_dict, session, auto_commit=auto_commit, reload=reload, contact_ids=contact_ids)
             return self.to_response(home_doc) if reload else home_doc
         except ValueError:
             raise
@@ -61,16 +63,19 @@ class ResidenceService(Service[ResidenceResponse, ResidenceRepository, Residence
     def update(
         self,
         item_id: int,
-        data: ResidenceUpdate,
+        data: ResidenceUpdate | Dict[str, Any],
         session: Session,
         auto_commit: bool = True,
         preloaded: Optional[HomeDoc] = None,
         reload: bool = True,
+        contact_ids: Optional[Dict[Tuple, int]] = None,
     ) -> ResidenceResponse | HomeDoc:
         try:
-            residence_dict = data.model_dump(exclude_unset=True)
+            residence_dict = data if isinstance(data, dict) else data.model_dump(exclude_unset=True)
             self._validate_entity(residence_dict)
-            home_doc = self.repo.update(item_id, residence_dict, session, auto_commit=auto_commit, preloaded=preloaded)
+            home_doc = self.repo.update(
+                item_id, residence_dict, session, auto_commit=auto_commit, preloaded=preloaded, contact_ids=contact_ids
+            )
             if not home_doc:
                 raise ValueError(f"Residence with id {item_id} not found")
             return self.to_response(home_doc) if reload else home_doc
@@ -1,9 +1,33 @@
+from typing import Optional
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     RENTCAST_RENTAL_LISTING_API: str
     RENTCAST_RENTAL_LISTING_API_KEY: str
+    RENTCAST_FETCH_PAGES: int = 1
+    RENTCAST_FETCH_MAX_IN_FLIGHT: int = 4
+    RENTCAST_CONNECT_TIMEOUT: float = 5.0
+    RENTCAST_READ_TIMEOUT: float = 30.0
+    RENTCAST_RATE_LIMIT: float = 5.0
+    RENTCAST_RATE_BURST: int = 5
+    RENTCAST_MAX_RETRIES: int = 3
+    RENTCAST_BACKOFF_BASE: float = 0.5
+    RENTCAST_BACKOFF_MAX: float = 30.0
+    RENTCAST_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    RENTCAST_CIRCUIT_RESET_TIMEOUT: float = 60.0
+    RENTCAST_RESPONSE_CACHE_DIR: Optional[str] = None
+    RENTCAST_RESPONSE_CACHE_FRESHNESS: int = 60 * 60
+    RENTCAST_RECORD_DIR: Optional[str] = None
+    RENTCAST_REPLAY_DIR: Optional[str] = None
+    PIPELINE_CHECKPOINT_DIR: str = ".checkpoints"
+    PIPELINE_CHECKPOINT_MAX_AGE: int = 24 * 60 * 60
+    PIPELINE_CHECKPOINT_LOCK_TIMEOUT: float = 10 * 60
+    PIPELINE_TRANSFORM_WORKERS: int = 0
+    PIPELINE_TRANSFORM_SHARD_SIZE: int = 1000
+    PIPELINE_PROFILE_DIR: str = ".profiles"
+    PIPELINE_BULK_WRITE: bool = False
+    PIPELINE_COPY_THRESHOLD: int = 1000
 
     model_config = SettingsConfigDict(
         env_file=Path(__file__).resolve().parents[2] / ".env", 
@@ -1,52 +1,246 @@
+import asyncio
 import logging
-import requests
 import json
-from datetime import datetime, date
 from urllib.parse import quote
-from dateutil.relativedelta import relativedelta
 from pipeline.operation import Operation
-from db.constants import select, update_row_by_id
+from pipeline.chunking import chunked
+from pipeline.parallel_batch import ParallelBatch
+from pipeline.json_stream import READ_SIZE, iter_json_array, aiter_json_array, iter_json_file
+from fusion.rental_listing.rentcast_quota import reserve_pages, settle_reservation
 from fusion.rental_listing.api_config import api_settings
+from fusion.rental_listing.rentcast_client import rentcast_client
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_IN_FLIGHT = 4
+
+class PageFetchOper(Operation):
+    # Fetches one page, by offset, for the ParallelBatch that FetchOper runs over its reserved offsets
+    def __init__(self, fetch_oper, property_type, limit):
+        super().__init__()
+        self._fetch_oper = fetch_oper
+        self._property_type = property_type
+        self._limit = limit
+
+    def run(self, input=None):
+        return self._fetch_oper._fetch_page(self._property_type, self._limit, input)
+
+
 class FetchOper(Operation):
-    def __init__(self, property_type):
+    def __init__(self, property_type, pages=1, max_in_flight=DEFAULT_MAX_IN_FLIGHT, response_cache=None, archive=None):
         super().__init__()  
+        if pages < 1:
+            raise ValueError(f"pages must be a positive integer, got {pages}")
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be a positive integer, got {max_in_flight}")
         self._property_type = property_type
+        self._pages = pages
+        self._max_in_flight = max_in_flight
+        self._response_cache = response_cache
+        self._archive = archive
         self._folder = "fusion/rental_listing"
         self._api_example_file = "api_example"
 
     def run(self, input=None):
-        res_select = select("SELECT * FROM rentcast_stats WHERE id = %s", (1,))
-        rentcast_stats = res_select
-
-        logger.debug(f"current rentcast_stats: {rentcast_stats}")
-        limit = rentcast_stats["limit_value"]
-        offset = rentcast_stats["offset_value"]
-
-        if self._is_payment_date_passed(str(rentcast_stats["next_payment_date"])):
-            response = self._fetch(self._property_type, limit, offset)
-            rentcast_stats["api_calls_number"] = 1
-            rentcast_stats["offset_value"] = offset +  limit
-            rentcast_stats["next_payment_date"] = self._increment_payment_date_by_month(rentcast_stats["next_payment_date"])
-            update_row_by_id("rentcast_stats", rentcast_stats, 1)
-            output = response.json()
-        elif rentcast_stats["api_calls_number"] >= rentcast_stats["api_calls_max_number"]:    
-            with open(f'{self._folder}/{self._api_example_file}.json', 'r') as api_example_file:
-                api_example = json.load(api_example_file)
-            output = api_example
-        else:
-            response = self._fetch(self._property_type, limit, offset )
-            rentcast_stats["api_calls_number"] = rentcast_stats["api_calls_number"] + 1
-            rentcast_stats["offset_value"] = offset +  limit
-            update_row_by_id("rentcast_stats", rentcast_stats, 1)
-            output = response.json()
-
-        logger.debug(f"new rentcast_stats: {rentcast_stats}")
+        cached = self._cached_listings()
+        if cached is not None:
+            return cached
+
+        reservation = reserve_pages(self._pages)
+        if not reservation["pages"]:
+            return self._load_fallback()
+
+        responses = self._fetch_pages(self._property_type, reservation["limit_value"], self._page_offsets(reservation))
+        output, calls, advanced_pages = self._collect_pages(reservation["limit_value"], responses)
+        settle_reservation(reservation, calls, advanced_pages)
+        self._record_range(reservation, advanced_pages)
+        self._raise_if_all_failed(responses)
+
         return output
 
-    def _fetch(self, property_type, limit, offset): 
+    async def arun(self, input=None):
+        cached = await asyncio.to_thread(self._cached_listings)
+        if cached is not None:
+            return cached
+
+        reservation = await asyncio.to_thread(reserve_pages, self._pages)
+        if not reservation["pages"]:
+            return await asyncio.to_thread(self._load_fallback)
+
+        responses = await self._afetch_pages(self._property_type, reservation["limit_value"], self._page_offsets(reservation))
+        output, calls, advanced_pages = self._collect_pages(reservation["limit_value"], responses)
+        await asyncio.to_thread(settle_reservation, reservation, calls, advanced_pages)
+        await asyncio.to_thread(self._record_range, reservation, advanced_pages)
+        self._raise_if_all_failed(responses)
+
+        return output
+
+    def stream(self, input_chunks):
+        chunk_size = self.get_context_value("chunk_size")
+        for chunk in input_chunks:
+            yield from chunked(self._iter_listings(), chunk_size)
+
+    async def astream(self, input_chunks):
+        chunk_size = self.get_context_value("chunk_size")
+        async for chunk in input_chunks:
+            sub_chunk = []
+            async for listing in self._aiter_listings():
+                sub_chunk.append(listing)
+                if len(sub_chunk) == chunk_size:
+                    yield sub_chunk
+                    sub_chunk = []
+            if sub_chunk:
+                yield sub_chunk
+
+    def _page_offsets(self, reservation):
+        return [reservation["start_offset"] + page * reservation["limit_value"] for page in range(reservation["pages"])]
+
+    def _collect_pages(self, limit, responses):
+        # Every answered request is billed, retries and error responses included (fresh cache hits are not),
+        # and every successful page is ingested, but the offset only moves past the leading run of successful
+        # pages so a failed page in the middle is fetched again next time.
+        output = []
+        calls = 0
+        advanced_pages = 0
+        first_error = None
+        in_prefix = True
+
+        for page in responses:
+            if isinstance(page, Exception):
+                calls += _answered(page)
+                first_error = first_error or page
+                in_prefix = False
+                continue
+            listings, answered = page
+            calls += answered
+            output.extend(listings)
+            if not in_prefix:
+                continue
+            advanced_pages += 1
+            if len(listings) < limit:
+                in_prefix = False
+
+        if first_error and output:
+            logger.warning(f"Offset advanced {advanced_pages} of {len(responses)} pages, stopped at: {first_error}")
+
+        return output, calls, advanced_pages
+
+    def _raise_if_all_failed(self, responses):
+        if all(isinstance(page, Exception) for page in responses):
+            raise responses[0]
+
+    def _iter_listings(self):
+        # Pages are parsed incrementally and fetched one after another, so the first listings reach
+        # transformation while the rest of the page is still downloading.
+        cached = self._cached_listings()
+        if cached is not None:
+            yield from cached
+            return
+
+        reservation = reserve_pages(self._pages)
+        if not reservation["pages"]:
+            cached = self._cached_listings(fresh=False)
+            yield from iter_json_file(self._api_example_path()) if cached is None else cached
+            return
+
+        limit = reservation["limit_value"]
+        calls = 0
+        advanced_pages = 0
+        try:
+            for offset in self._page_offsets(reservation):
+                try:
+                    listings, answered = self._open_page(self._property_type, limit, offset)
+                    calls += answered
+                    count = 0
+                    for listing in listings:
+                        count += 1
+                        yield listing
+                except Exception as e:
+                    calls += _answered(e)
+                    if advanced_pages == 0:
+                        raise
+                    logger.warning(f"Fetched {advanced_pages} of {reservation['pages']} pages, stopped at: {e}")
+                    break
+                advanced_pages += 1
+                if count < limit:
+                    break
+        finally:
+            settle_reservation(reservation, calls, advanced_pages)
+            self._record_range(reservation, advanced_pages)
+
+    async def _aiter_listings(self):
+        cached = await asyncio.to_thread(self._cached_listings)
+        if cached is not None:
+            for listing in cached:
+                yield listing
+            return
+
+        reservation = await asyncio.to_thread(reserve_pages, self._pages)
+        if not reservation["pages"]:
+            cached = await asyncio.to_thread(self._cached_listings, False)
+            for listing in iter_json_file(self._api_example_path()) if cached is None else cached:
+                yield listing
+            return
+
+        limit = reservation["limit_value"]
+        calls = 0
+        advanced_pages = 0
+        try:
+            for offset in self._page_offsets(reservation):
+                try:
+                    listings, answered = await self._aopen_page(self._property_type, limit, offset)
+                    calls += answered
+                    count = 0
+                    async for listing in listings:
+                        count += 1
+                        yield listing
+                except Exception as e:
+                    calls += _answered(e)
+                    if advanced_pages == 0:
+                        raise
+                    logger.warning(f"Fetched {advanced_pages} of {reservation['pages']} pages, stopped at: {e}")
+                    break
+                advanced_pages += 1
+                if count < limit:
+                    break
+        finally:
+            await asyncio.to_thread(settle_reservation, reservation, calls, advanced_pages)
+            await asyncio.to_thread(self._record_range, reservation, advanced_pages)
+
+    def _cached_listings(self, fresh=True):
+        # A repeat run within the freshness window is served from the pages the last run ingested,
+        # without reserving quota or moving the offset
+        if self._response_cache is None:
+            return None
+        pages = self._response_cache.last_range(self._property_type, fresh)
+        if pages is None:
+            return None
+        logger.info(f"Serving {len(pages)} cached RentCast pages for {self._property_type}")
+        return [listing for page in pages for listing in page]
+
+    def _record_range(self, reservation, advanced_pages):
+        if self._response_cache is None or not advanced_pages:
+            return
+        offsets = self._page_offsets(reservation)[:advanced_pages]
+        try:
+            self._response_cache.record_range(self._property_type, reservation["limit_value"], offsets)
+        except Exception as e:
+            logger.warning(f"Failed to record the cached RentCast range for {self._property_type}: {e}")
+
+    def _load_fallback(self):
+        # Out of quota: the last ingested pages are real data, even if stale, so prefer them to the example
+        cached = self._cached_listings(fresh=False)
+        return self._load_api_example() if cached is None else cached
+
+    def _api_example_path(self):
+        return f'{self._folder}/{self._api_example_file}.json'
+
+    def _load_api_example(self):
+        with open(self._api_example_path(), 'r') as api_example_file:
+            api_example = json.load(api_example_file)
+        return api_example
+
+    def _request_args(self, property_type, limit, offset):
         quoted_property_type = quote(property_type)
         url = f"{api_settings.RENTCAST_RENTAL_LISTING_API}?propertyType={quoted_property_type}&limit={limit}&offset={offset}"
         headers = {
@@ -54,21 +248,192 @@ class FetchOper(Operation):
             "X-Api-Key": api_settings.RENTCAST_RENTAL_LISTING_API_KEY
             }
 
-        response = requests.get(url, headers=headers)
+        return url, headers
+
+    def _fetch_pages(self, property_type, limit, offsets):
+        # Failed pages come back as their exceptions, in offset order; per-page timings and errors
+        # land in the run context under FetchOper_pages_*
+        page_batch = ParallelBatch(
+            PageFetchOper(self, property_type, limit),
+            max_workers=min(self._max_in_flight, len(offsets)),
+            raise_on_error=False,
+            name=f"{self.__class__.__name__}_pages"
+        )
+        page_batch.set_context(self._context)
+        return page_batch.run(offsets)
+
+    async def _afetch_pages(self, property_type, limit, offsets):
+        in_flight = asyncio.Semaphore(self._max_in_flight)
+
+        async def fetch_page(offset):
+            async with in_flight:
+                try:
+                    return await self._afetch_page(property_type, limit, offset)
+                except Exception as e:
+                    return e
+
+        return await asyncio.gather(*[fetch_page(offset) for offset in offsets])
+
+    def _fetch_page(self, property_type, limit, offset):
+        cached = self._cached_page(property_type, limit, offset)
+        if cached and self._response_cache.is_fresh(cached):
+            return cached["body"], 0
+
+        response, answered = self._fetch(property_type, limit, offset, self._validators(cached))
+        try:
+            return self._store_page(property_type, limit, offset, cached, response), answered
+        except Exception as e:
+            raise _charged(e, answered)
+
+    async def _afetch_page(self, property_type, limit, offset):
+        cached = await asyncio.to_thread(self._cached_page, property_type, limit, offset)
+        if cached and self._response_cache.is_fresh(cached):
+            return cached["body"], 0
+
+        response, answered = await self._afetch(property_type, limit, offset, self._validators(cached))
+        try:
+            return await asyncio.to_thread(self._store_page, property_type, limit, offset, cached, response), answered
+        except Exception as e:
+            raise _charged(e, answered)
+
+    def _open_page(self, property_type, limit, offset):
+        cached = self._cached_page(property_type, limit, offset)
+        if cached and self._response_cache.is_fresh(cached):
+            return iter(cached["body"]), 0
+
+        url, headers = self._request_args(property_type, limit, offset)
+        headers.update(self._validators(cached))
+        response, answered = rentcast_client.get(url, headers=headers, stream=True)
+        if response.status_code == 304 and cached:
+            response.close()
+            self._response_cache.touch(property_type, limit, offset, cached)
+            return iter(cached["body"]), answered
+        try:
+            response.raise_for_status()
+        except Exception as e:
+            response.close()
+            raise _charged(e, answered)
+
+        return self._iter_response(property_type, limit, offset, response), answered
+
+    def _iter_response(self, property_type, limit, offset, response):
+        listings = [] if self._keeps_payloads() else None
+        try:
+            for listing in iter_json_array(response.iter_content(READ_SIZE)):
+                if listings is not None:
+                    listings.append(listing)
+                yield listing
+        finally:
+            response.close()
+
+        if listings is not None:
+            self._store_listings(property_type, limit, offset, listings, response.headers)
+
+    async def _aopen_page(self, property_type, limit, offset):
+        cached = await asyncio.to_thread(self._cached_page, property_type, limit, offset)
+        if cached and self._response_cache.is_fresh(cached):
+            return self._aiter_cached(cached), 0
+
+        url, headers = self._request_args(property_type, limit, offset)
+        headers.update(self._validators(cached))
+        response, answered = await rentcast_client.aget(url, headers=headers, stream=True)
+        if response.status_code == 304 and cached:
+            await response.aclose()
+            await asyncio.to_thread(self._response_cache.touch, property_type, limit, offset, cached)
+            return self._aiter_cached(cached), answered
+        try:
+            response.raise_for_status()
+        except Exception as e:
+            await response.aclose()
+            raise _charged(e, answered)
+
+        return self._aiter_response(property_type, limit, offset, response), answered
+
+    async def _aiter_cached(self, cached):
+        for listing in cached["body"]:
+            yield listing
+
+    async def _aiter_response(self, property_type, limit, offset, response):
+        listings = [] if self._keeps_payloads() else None
+        try:
+            async for listing in aiter_json_array(response.aiter_bytes(READ_SIZE)):
+                if listings is not None:
+                    listings.append(listing)
+                yield listing
+        finally:
+            await response.aclose()
+
+        if listings is not None:
+            await asyncio.to_thread(self._store_listings, property_type, limit, offset, listings, response.headers)
+
+    def _cached_page(self, property_type, limit, offset):
+        if self._response_cache is None:
+            return None
+        return self._response_cache.get(property_type, limit, offset)
+
+    def _validators(self, cached):
+        if cached is None:
+            return {}
+        return self._response_cache.validators(cached)
+
+    def _store_page(self, property_type, limit, offset, cached, response):
+        if response.status_code == 304 and cached:
+            logger.debug(f"RentCast page {property_type}/{limit}/{offset} not modified, serving cached copy")
+            self._response_cache.touch(property_type, limit, offset, cached)
+            return cached["body"]
+
+        listings = response.json()
+        if self._keeps_payloads():
+            self._store_listings(property_type, limit, offset, listings, response.headers)
+        return listings
+
+    def _keeps_payloads(self):
+        return self._response_cache is not None or self._archive is not None
+
+    def _store_listings(self, property_type, limit, offset, listings, response_headers):
+        if self._response_cache is not None:
+            self._response_cache.put(
+                property_type, limit, offset, listings,
+                etag=response_headers.get("ETag"),
+                last_modified=response_headers.get("Last-Modified")
+            )
+        if self._archive is not None:
+            self._archive.record(property_type, limit, offset, listings)
+
+    def _fetch(self, property_type, limit, offset, conditional_headers=None):
+        url, headers = self._request_args(property_type, limit, offset)
+        headers.update(conditional_headers or {})
+
+        response, answered = rentcast_client.get(url, headers=headers)
+        if response.status_code != 304:
+            _raise_for_status(response, answered)
+
+        return response, answered
+
+    async def _afetch(self, property_type, limit, offset, conditional_headers=None):
+        url, headers = self._request_args(property_type, limit, offset)
+        headers.update(conditional_headers or {})
+
+        response, answered = await rentcast_client.aget(url, headers=headers)
+        if response.status_code != 304:
+            _raise_for_status(response, answered)
+
+        return response, answered
+
+
+def _raise_for_status(response, answered):
+    try:
+        response.raise_for_status()
+    except Exception as e:
+        raise _charged(e, answered)
 
-        return response
 
-    def _is_payment_date_passed(self, payment_date):
-        today = date.today()
-        target_date = datetime.strptime(payment_date, "%Y-%m-%d").date()
+def _charged(error, answered):
+    # RentCast answered the requests, so they are billed even though the page could not be used
+    error.answered = answered
+    return error
 
-        if today <= target_date:
-            return False
-        else:
-            return True
 
-    def _increment_payment_date_by_month(self, date):
-        current_payment_date = datetime.strptime(str(date), "%Y-%m-%d").date()
-        next_payment_date = current_payment_date + relativedelta(months=1)
-        
-        return next_payment_date.isoformat()
+def _answered(error):
+    # rentcast_client sets the same attribute on the errors it raises after answered retries
+    return getattr(error, "answered", 0)
@@ -1,21 +1,26 @@
 import logging
+from typing import Any, Dict
 from sqlmodel import Session
-from entities.home_doc.repository import HomeDocRepository
+from entities.home_doc.external_id_matching import match_external_ids
 from entities.residence.dtos import ResidenceCreate, ListingContactCreate, ListingHistoryCreate, ResidenceUpdate, ListingContactUpdate, ListingHistoryUpdate
 from entities.common.enums import HomeDocTypeEnum, HomeDocCategoriesEnum, ListingStatusEnum
 from fusion.rental_listing.transformation import PropertyListing
 from pipeline.operation import Operation
+from pipeline.content_key import content_key
 from db.session import engine
 
 logger = logging.getLogger(__name__)
 
 class FusionOper(Operation):
-    def __init__(self):
+    # The output carries residence ids and fingerprints read from the database, which a resumed run
+    # could find stale, so it is fused again from the transformed listings instead
+    checkpointed = False
+
+    def __init__(self, trusted=True):
         super().__init__()
+        self._trusted = trusted
 
     def run(self, input):
-        home_doc_repo = HomeDocRepository.get_instance()
-
         with Session(engine) as session:
             try:
                 property_listings = input
@@ -29,28 +34,112 @@ class FusionOper(Operation):
                         "bathrooms": propertyListing.bathrooms
                     }
 
-                ids_by_external_ids = home_doc_repo.get_ids_by_external_ids(
-                    external_ids,
-                    session
-                )
+                matches = {
+                    row.external_id: (row.id, row.source_fingerprint)
+                    for row in match_external_ids(external_ids, session)
+                }
                 output = []
+                unchanged = 0
 
                 for propertyListing in property_listings:
-                    if propertyListing.rentcastId in ids_by_external_ids:
-                        residence_id = ids_by_external_ids[propertyListing.rentcastId]
-                        output.append((residence_id, self.property_listing_to_update_residence(propertyListing)))
-                    else:
-                        output.append((None, self.property_listing_to_create_residence(propertyListing)))
+                    residence_id, stored_fingerprint = matches.get(propertyListing.rentcastId, (None, None))
+                    update_row = self.property_listing_to_update_row(propertyListing)
+                    fingerprint = self.source_fingerprint(update_row)
+                    if not residence_id:
+                        output.append((None, self._to_create_residence(propertyListing, fingerprint)))
+                        continue
 
-                self.set_context_value("rooms_numbers_by_external_ids", rooms_numbers_by_external_ids)
+                    # A matched residence whose stored fingerprint equals the listing's has nothing to update
+                    if stored_fingerprint == fingerprint:
+                        unchanged += 1
+                        continue
+                    output.append((residence_id, self._to_update_residence(propertyListing, update_row, fingerprint)))
 
-                logger.debug(f"Fused {len(output)} property listings ({len(ids_by_external_ids)} matched to existing residences)")
+                # In streaming mode run() is called once per chunk, so merge instead of overwriting
+                known_rooms_numbers = self.get_context_value("rooms_numbers_by_external_ids") or {}
+                known_rooms_numbers.update(rooms_numbers_by_external_ids)
+                self.set_context_value("rooms_numbers_by_external_ids", known_rooms_numbers)
+
+                unchanged_key = f"{self.__class__.__name__}_unchanged"
+                self.set_context_value(unchanged_key, (self.get_context_value(unchanged_key) or 0) + unchanged)
+
+                logger.debug(
+                    f"Fused {len(output)} property listings ({len(matches)} matched to existing residences, "
+                    f"{unchanged} unchanged and skipped)"
+                )
 
                 return output
             except Exception as e:
                 logger.error(f"Error in Fusion Operation: {str(e)}")
                 raise
 
+    def source_fingerprint(self, update_row: Dict[str, Any]) -> str:
+        # Hash of the fields fusion writes, so listing fields nobody stores never count as a change.
+        # Created residences store it too, hashed from the update row the next sync compares against.
+        output = content_key(update_row)
+        return output
+
+    def _to_create_residence(self, property_listing: PropertyListing, fingerprint: str) -> ResidenceCreate | Dict[str, Any]:
+        if not self._trusted:
+            return self.property_listing_to_create_residence(property_listing)
+        residence = dict(self.property_listing_to_create_row(property_listing), source_fingerprint=fingerprint)
+        return residence
+
+    def _to_update_residence(self, property_listing: PropertyListing, update_row: Dict[str, Any], fingerprint: str) -> ResidenceUpdate | Dict[str, Any]:
+        if not self._trusted:
+            # The DTOs used by the API have no fingerprint, so only trusted rows skip unchanged updates
+            return self.property_listing_to_update_residence(property_listing)
+        residence = dict(update_row, source_fingerprint=fingerprint)
+        return residence
+
+    # The *_row methods map an already validated listing straight to the dicts ResidenceService hands to
+    # the repository, producing what the DTOs' model_dump would without validating the data again.
+    def property_listing_to_create_row(self, property_listing: PropertyListing) -> Dict[str, Any]:
+        interior_entity_key = _strip(property_listing.interiorEntityKey)
+        if not interior_entity_key:
+            raise ValueError(f"Listing {property_listing.rentcastId} has no address, interior_entity_key cannot be empty")
+
+        row = {
+            "external_id": _strip(property_listing.rentcastId),
+            "interior_entity_key": interior_entity_key,
+            "category": HomeDocCategoriesEnum.ONE_STORY_HOUSE.value,
+            "type": HomeDocTypeEnum.PROPERTY.value,
+            "extra_data": [],
+            "area": property_listing.area,
+            "construction_year": property_listing.constructionYear,
+            "price": property_listing.price,
+            "hoa_fee": property_listing.hoa.fee if property_listing.hoa else None,
+            "bedrooms": property_listing.bedrooms,
+            "bathrooms": property_listing.bathrooms,
+            "listing_status": (property_listing.status or ListingStatusEnum.inactive).value,
+            "listing_agent": _contact_row(property_listing.listingAgent, exclude_none=True),
+            "listing_office": _contact_row(property_listing.listingOffice, exclude_none=True),
+            "listing_history": _history_rows(property_listing.history, exclude_none=True),
+        }
+        output = {field: value for field, value in row.items() if value is not None}
+        return output
+
+    def property_listing_to_update_row(self, property_listing: PropertyListing) -> Dict[str, Any]:
+        output = {
+            "external_id": _strip(property_listing.rentcastId),
+            "description": None,
+            "extra_data": [],
+            "area": property_listing.area,
+            "sub_entities_quantity": None,
+            "construction_year": property_listing.constructionYear,
+            "length": None,
+            "width": None,
+            "price": property_listing.price,
+            "hoa_fee": property_listing.hoa.fee if property_listing.hoa else None,
+            "bedrooms": property_listing.bedrooms,
+            "bathrooms": property_listing.bathrooms,
+            "listing_status": (property_listing.status or ListingStatusEnum.inactive).value,
+            "listing_agent": _contact_row(property_listing.listingAgent),
+            "listing_office": _contact_row(property_listing.listingOffice),
+            "listing_history": _history_rows(property_listing.history),
+        }
+        return output
+
     def property_listing_to_create_residence(self, property_listing: PropertyListing) -> ResidenceCreate:
         return ResidenceCreate(
             external_id=property_listing.rentcastId,
@@ -131,3 +220,36 @@ class FusionOper(Operation):
                 ) for item in property_listing.history.values()
             ] if property_listing.history else []
         )
+
+
+def _strip(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def _contact_row(contact, exclude_none=False):
+    if not contact:
+        return None
+    row = {
+        "name": _strip(contact.name),
+        "phone": _strip(contact.phone),
+        "email": _strip(contact.email),
+        "website": _strip(contact.website),
+    }
+    return {field: value for field, value in row.items() if value is not None} if exclude_none else row
+
+
+def _history_rows(history, exclude_none=False):
+    if not history:
+        return []
+    rows = []
+    for item in history.values():
+        row = {
+            "event": _strip(item.event),
+            "price": item.price,
+            "listing_type": item.listingType.value if item.listingType else None,
+            "listed_date": item.listedDate,
+            "removed_date": item.removedDate,
+            "days_on_market": item.daysOnMarket,
+        }
+        rows.append({field: value for field, value in row.items() if value is not None} if exclude_none else row)
+    return rows
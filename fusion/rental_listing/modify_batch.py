@@ -10,51 +10,23 @@ logger = logging.getLogger(__name__)
 
 
 class ModifyBatch(Batch):
-    def __init__(self, operation):
+    def __init__(self, operation, bulk=False, copy_threshold=0):
         super().__init__(operation)
+        self._bulk = bulk
+        self._copy_threshold = copy_threshold
+        # Contact ids resolved in this run, keyed by (name, phone, email); only committed ids are kept
+        self._contact_ids = {}
 
     def run(self, input):
         data = input
         if not isinstance(data, list):
             raise TypeError("data at Batch must be a list, got {type(data).__name__}")
-        output = list()
 
-        residence_repo = ResidenceRepository.get_instance()
-        residence_srv = ResidenceService.get_instance(residence_repo)
         subphases = {}
 
         with Session(engine) as session:
             try:
-                self._operation.set_context_value("session", session)
-
-                preload_start = time.perf_counter()
-                update_ids = [residence_id for residence_id, _ in data if residence_id]
-                preloaded_home_docs = residence_repo.get_by_ids(update_ids, session)
-                self._operation.set_context_value("preloaded_home_docs", preloaded_home_docs)
-                subphases["preload"] = time.perf_counter() - preload_start
-
-                write_start = time.perf_counter()
-                with session.no_autoflush:
-                    for elem in data:
-                        try:
-                            result = self._operation.run(elem)
-                            output.append(result)
-                        except Exception as e:
-                            logger.error(f"Error processing element: {str(e)}")
-                            session.rollback()
-                            raise Exception(f"Failed to process element: {str(e)}")
-                session.flush()
-                subphases["write_loop"] = time.perf_counter() - write_start
-
-                all_ids = [home_doc.id for home_doc in output]
-                session.commit()
-                logger.info(f"Successfully processed {len(output)} elements")
-
-                reload_start = time.perf_counter()
-                reloaded_home_docs = residence_repo.get_by_ids(all_ids, session)
-                output = [residence_srv.to_response(reloaded_home_docs[home_doc_id]) for home_doc_id in all_ids]
-                subphases["reload"] = time.perf_counter() - reload_start
-
+                output = self._modify_chunk(data, session, subphases)
                 self.set_context_value(f"{self.__class__.__name__}_subphases", subphases)
 
             except Exception as e:
@@ -63,3 +35,140 @@ class ModifyBatch(Batch):
                 raise Exception(f"Batch processing failed: {str(e)}")
 
         return output
+
+    def stream(self, input_chunks):
+        # Each chunk is committed on its own so the session never holds more than one chunk of rows;
+        # a failure rolls back the current chunk only.
+        subphases = {}
+
+        with Session(engine) as session:
+            for data in input_chunks:
+                if not isinstance(data, list):
+                    raise TypeError(f"data at Batch must be a list, got {type(data).__name__}")
+                try:
+                    output = self._modify_chunk(data, session, subphases)
+                    self.set_context_value(f"{self.__class__.__name__}_subphases", subphases)
+                    session.expunge_all()
+                except Exception as e:
+                    logger.error(f"Batch processing error: {str(e)}")
+                    session.rollback()
+                    raise Exception(f"Batch processing failed: {str(e)}")
+
+                yield output
+
+    def _modify_chunk(self, data, session, subphases):
+        # Only trusted rows (plain dicts from FusionOper) can skip the per-residence ORM path
+        if self._bulk and all(isinstance(residence, dict) for _, residence in data):
+            return self._bulk_modify_chunk(data, session, subphases)
+
+        output = list()
+
+        residence_repo = ResidenceRepository.get_instance()
+        residence_srv = ResidenceService.get_instance(residence_repo)
+
+        self._operation.set_context_value("session", session)
+
+        preload_start = time.perf_counter()
+        update_ids = [residence_id for residence_id, _ in data if residence_id]
+        preloaded_home_docs = residence_repo.get_by_ids(update_ids, session)
+        self._operation.set_context_value("preloaded_home_docs", preloaded_home_docs)
+
+        # Residences matched by external id but deleted since (e.g. by another worker) are skipped;
+        # the next run no longer matches them and creates them again.
+        stale_ids = {residence_id for residence_id in update_ids if residence_id not in preloaded_home_docs}
+        if stale_ids:
+            logger.warning(f"Skipping {len(stale_ids)} residences that no longer exist: {sorted(stale_ids)}")
+            data = [elem for elem in data if elem[0] not in stale_ids]
+            error_count_key = f"{self.__class__.__name__}_errors"
+            self.set_context_value(error_count_key, (self.get_context_value(error_count_key) or 0) + len(stale_ids))
+        subphases["preload"] = subphases.get("preload", 0.0) + time.perf_counter() - preload_start
+
+        contact_ids = self._resolve_contacts(data, session, subphases)
+        self._operation.set_context_value("contact_ids", contact_ids)
+
+        write_start = time.perf_counter()
+        with session.no_autoflush:
+            for elem in data:
+                try:
+                    result = self._operation.run(elem)
+                    output.append(result)
+                except Exception as e:
+                    logger.error(f"Error processing element: {str(e)}")
+                    session.rollback()
+                    raise Exception(f"Failed to process element: {str(e)}")
+        session.flush()
+        subphases["write_loop"] = subphases.get("write_loop", 0.0) + time.perf_counter() - write_start
+
+        all_ids = [home_doc.id for home_doc in output]
+        session.commit()
+        self._contact_ids.update(contact_ids)
+        logger.info(f"Successfully processed {len(output)} elements")
+
+        reload_start = time.perf_counter()
+        reloaded_home_docs = residence_repo.get_by_ids(all_ids, session)
+        output = [residence_srv.to_response(reloaded_home_docs[home_doc_id]) for home_doc_id in all_ids]
+        subphases["reload"] = subphases.get("reload", 0.0) + time.perf_counter() - reload_start
+
+        return output
+
+    def _bulk_modify_chunk(self, data, session, subphases):
+        residence_repo = ResidenceRepository.get_instance()
+        residence_srv = ResidenceService.get_instance(residence_repo)
+
+        contact_ids = {}
+        write_start = time.perf_counter()
+        try:
+            # Past the threshold, COPY into staging tables beats sending every column as an array parameter;
+            # the merge resolves contacts itself
+            if self._copy_threshold and len(data) >= self._copy_threshold:
+                ids = residence_repo.copy_upsert(data, session)
+            else:
+                contact_ids = self._resolve_contacts(data, session, subphases)
+                ids = residence_repo.bulk_upsert(data, session, contact_ids=contact_ids)
+        except Exception as e:
+            logger.error(f"Error in bulk write: {str(e)}")
+            session.rollback()
+            raise Exception(f"Failed to write residences: {str(e)}")
+        subphases["write"] = subphases.get("write", 0.0) + time.perf_counter() - write_start
+
+        # Update rows whose residence was deleted since it was matched are skipped, like in the ORM path
+        error_count_key = f"{self.__class__.__name__}_errors"
+        stale_ids = {residence_id for (residence_id, _), home_doc_id in zip(data, ids) if residence_id and home_doc_id is None}
+        if stale_ids:
+            logger.warning(f"Skipping {len(stale_ids)} residences that no longer exist: {sorted(stale_ids)}")
+            self.set_context_value(error_count_key, (self.get_context_value(error_count_key) or 0) + len(stale_ids))
+
+        # Create rows whose external id is taken by a home_doc that is not a residence are left alone
+        rejected = [residence["external_id"] for (residence_id, residence), home_doc_id in zip(data, ids) if not residence_id and home_doc_id is None]
+        if rejected:
+            logger.warning(f"Skipping {len(rejected)} listings whose external id belongs to another home doc type: {rejected}")
+            self.set_context_value(error_count_key, (self.get_context_value(error_count_key) or 0) + len(rejected))
+
+        session.commit()
+        self._contact_ids.update(contact_ids)
+        all_ids = list(dict.fromkeys(home_doc_id for home_doc_id in ids if home_doc_id is not None))
+        logger.info(f"Successfully processed {len(all_ids)} elements")
+
+        reload_start = time.perf_counter()
+        reloaded_home_docs = residence_repo.get_by_ids(all_ids, session)
+        output = [residence_srv.to_response(reloaded_home_docs[home_doc_id]) for home_doc_id in all_ids]
+        subphases["reload"] = subphases.get("reload", 0.0) + time.perf_counter() - reload_start
+
+        return output
+
+    def _resolve_contacts(self, data, session, subphases):
+        # Every distinct agent and office of the chunk is resolved up front in two statements, instead of an
+        # upsert and a lookup per residence while writing
+        contacts_start = time.perf_counter()
+        contacts = []
+        for _, residence in data:
+            for relationship_field in ("listing_agent", "listing_office"):
+                contact = residence.get(relationship_field) if isinstance(residence, dict) else getattr(residence, relationship_field, None)
+                if contact is not None and not isinstance(contact, dict):
+                    contact = contact.model_dump()
+                if contact and "id" not in contact:
+                    contacts.append(contact)
+
+        output = ResidenceRepository.get_instance().resolve_contacts(contacts, session, known=self._contact_ids)
+        subphases["contacts"] = subphases.get("contacts", 0.0) + time.perf_counter() - contacts_start
+        return output
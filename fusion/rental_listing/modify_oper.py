@@ -18,6 +18,7 @@ class ModifyOper(Operation):
             raise Exception("Session not found in context. Modify Operation must be run within Modify Batch.")
 
         preloaded_home_docs = self.get_context_value("preloaded_home_docs") or {}
+        contact_ids = self.get_context_value("contact_ids")
 
         try:
             residence_id, residence = input
@@ -29,7 +30,8 @@ class ModifyOper(Operation):
                     session=session,
                     auto_commit=False,
                     preloaded=preloaded_home_docs.get(residence_id),
-                    reload=False
+                    reload=False,
+                    contact_ids=contact_ids
                 )
                 logger.debug(f"Updating a residence with id: {modified_residence.id} and address: {modified_residence.interior_entity_key}")
             else:
@@ -37,7 +39,8 @@ class ModifyOper(Operation):
                     data=residence,
                     session=session,
                     auto_commit=False,
-                    reload=False
+                    reload=False,
+                    contact_ids=contact_ids
                 )
                 logger.debug(f"Creating a new residence with id: {modified_residence.id} and address: {modified_residence.interior_entity_key}")
             output = modified_residence
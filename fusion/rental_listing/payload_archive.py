@@ -0,0 +1,77 @@
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from pipeline.json_stream import READ_SIZE, iter_json_array
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.jsonl"
+
+
+class PayloadArchive:
+    def __init__(self, directory):
+        self._directory = Path(directory)
+        self._lock = threading.Lock()
+
+    def record(self, property_type, limit, offset, listings):
+        recorded_at = datetime.now(timezone.utc)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", property_type).strip("-").lower()
+        file_name = f"{recorded_at:%Y%m%dT%H%M%S%f}_{slug}_{limit}_{offset}.json.gz"
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._directory / f"{file_name}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as payload_file:
+            json.dump(listings, payload_file)
+        os.replace(tmp_path, self._directory / file_name)
+
+        entry = {
+            "propertyType": property_type,
+            "limit": limit,
+            "offset": offset,
+            "recordedAt": recorded_at.isoformat(),
+            "listings": len(listings),
+            "file": file_name,
+        }
+        with self._lock:
+            with open(self._directory / INDEX_FILE, "a") as index_file:
+                index_file.write(json.dumps(entry) + "\n")
+        return entry
+
+    def entries(self, property_type=None, since=None, until=None, latest=True):
+        index_path = self._directory / INDEX_FILE
+        if not index_path.exists():
+            return []
+
+        entries = []
+        with open(index_path, "r") as index_file:
+            for line in index_file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                recorded_at = datetime.fromisoformat(entry["recordedAt"])
+                if property_type is not None and entry["propertyType"] != property_type:
+                    continue
+                if since is not None and recorded_at < since:
+                    continue
+                if until is not None and recorded_at > until:
+                    continue
+                entries.append(entry)
+
+        if latest:
+            # Keep only the most recent recording of each page, ordered by property type and offset
+            by_page = {}
+            for entry in entries:
+                by_page[(entry["propertyType"], entry["limit"], entry["offset"])] = entry
+            entries = sorted(by_page.values(), key=lambda entry: (entry["propertyType"], entry["offset"]))
+        return entries
+
+    def iter_listings(self, entries):
+        for entry in entries:
+            path = self._directory / entry["file"]
+            with gzip.open(path, "rb") as payload_file:
+                yield from iter_json_array(iter(lambda: payload_file.read(READ_SIZE), b""))
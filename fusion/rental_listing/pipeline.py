@@ -1,5 +1,5 @@
 from pipeline.pipeline import Pipeline
 
 class RentalListPipeline(Pipeline):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, checkpoint_store=None, checkpoint_key=None):
+        super().__init__(checkpoint_store, checkpoint_key)
@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+import requests
+import httpx
+from requests.adapters import HTTPAdapter
+from fusion.rental_listing.api_config import api_settings
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+LATENCY_WINDOW = 1000
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class TokenBucket:
+    # Adaptive: a 429 halves the refill rate, every successful request wins back a tenth of the base rate
+    def __init__(self, rate, burst, min_rate=None):
+        self._base_rate = rate
+        self._min_rate = min_rate or rate / 16
+        self._burst = burst
+        self.rate = rate
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def throttle(self):
+        with self._lock:
+            self.rate = max(self._min_rate, self.rate / 2)
+
+    def recover(self):
+        with self._lock:
+            self.rate = min(self._base_rate, self.rate + self._base_rate / 10)
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_timeout):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+        self.opens = 0
+        self.rejections = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def before_request(self):
+        with self._lock:
+            state = self._state()
+            if state == "open" or (state == "half_open" and self._trial_in_flight):
+                self.rejections += 1
+                retry_in = self._reset_timeout - (time.monotonic() - self._opened_at)
+                raise CircuitOpenError(f"RentCast circuit is open, retry in {max(retry_in, 0):.0f}s")
+            if state == "half_open":
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or (self._opened_at is None and self._failures >= self._failure_threshold):
+                self.opens += 1
+                logger.warning(f"RentCast circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self._reset_timeout:
+            return "open"
+        return "half_open"
+
+
+class RentcastClient:
+    def __init__(
+        self,
+        connect_timeout=5.0,
+        read_timeout=30.0,
+        rate=5.0,
+        burst=5,
+        max_retries=3,
+        backoff_base=0.5,
+        backoff_max=30.0,
+        failure_threshold=5,
+        reset_timeout=60.0,
+        pool_size=4
+    ):
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._pool_size = pool_size
+        self._bucket = TokenBucket(rate, burst)
+        self._breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._session = None
+        self._async_client = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled = 0
+
+    def get(self, url, headers=None, stream=False):
+        # Returns the response along with how many requests RentCast answered for it, retries included,
+        # since every answered request is billed. Errors raised from here carry that count as `answered`.
+        attempt = 0
+        answered = 0
+        try:
+            while True:
+                self._breaker.before_request()
+                self._bucket.acquire()
+                start = time.perf_counter()
+                try:
+                    response = self._get_session().get(
+                        url, headers=headers, stream=stream, timeout=(self._connect_timeout, self._read_timeout)
+                    )
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    self._record_failure(start)
+                    if attempt >= self._max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning(f"RentCast request failed ({e}), retrying in {delay:.2f}s")
+                except Exception:
+                    self._record_failure(start)
+                    raise
+                else:
+                    answered += 1
+                    if not self._record_response(start, response.status_code) or attempt >= self._max_retries:
+                        return response, answered
+                    delay = self._backoff(attempt, self._retry_after(response.headers))
+                    response.close()
+                    logger.warning(f"RentCast responded {response.status_code}, retrying in {delay:.2f}s")
+
+                attempt += 1
+                self._count_retry()
+                time.sleep(delay)
+        except Exception as e:
+            e.answered = answered
+            raise
+
+    async def aget(self, url, headers=None, stream=False):
+        client = self._get_async_client()
+        attempt = 0
+        answered = 0
+        try:
+            while True:
+                self._breaker.before_request()
+                await self._bucket.aacquire()
+                start = time.perf_counter()
+                try:
+                    response = await client.send(client.build_request("GET", url, headers=headers), stream=stream)
+                except httpx.TransportError as e:
+                    self._record_failure(start)
+                    if attempt >= self._max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning(f"RentCast request failed ({e!r}), retrying in {delay:.2f}s")
+                except Exception:
+                    self._record_failure(start)
+                    raise
+                else:
+                    answered += 1
+                    if not self._record_response(start, response.status_code) or attempt >= self._max_retries:
+                        return response, answered
+                    delay = self._backoff(attempt, self._retry_after(response.headers))
+                    await response.aclose()
+                    logger.warning(f"RentCast responded {response.status_code}, retrying in {delay:.2f}s")
+
+                attempt += 1
+                self._count_retry()
+                await asyncio.sleep(delay)
+        except Exception as e:
+            e.answered = answered
+            raise
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "throttled": self.throttled,
+            }
+        stats["rate"] = self._bucket.rate
+        stats["circuit"] = {
+            "state": self._breaker.state,
+            "opens": self._breaker.opens,
+            "rejections": self._breaker.rejections,
+        }
+        stats["latency"] = {"count": len(latencies)}
+        if latencies:
+            stats["latency"].update({
+                "mean": sum(latencies) / len(latencies),
+                "p50": latencies[int(0.5 * (len(latencies) - 1))],
+                "p90": latencies[int(0.9 * (len(latencies) - 1))],
+                "p99": latencies[int(0.99 * (len(latencies) - 1))],
+                "max": latencies[-1],
+            })
+        return stats
+
+    def _record_response(self, start, status_code):
+        # Returns whether the response is worth retrying
+        retryable = status_code in RETRYABLE_STATUSES
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(time.perf_counter() - start)
+            if retryable:
+                self.failures += 1
+            if status_code == 429:
+                self.throttled += 1
+
+        if status_code == 429:
+            self._bucket.throttle()
+        else:
+            self._bucket.recover()
+        if retryable:
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+        return retryable
+
+    def _record_failure(self, start):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self._latencies.append(time.perf_counter() - start)
+        self._breaker.record_failure()
+
+    def _count_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def _backoff(self, attempt, retry_after=None):
+        # Full jitter keeps concurrent fetches from retrying in lockstep
+        delay = random.uniform(0, min(self._backoff_max, self._backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self._backoff_max))
+        return delay
+
+    def _retry_after(self, headers):
+        value = headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self._read_timeout, connect=self._connect_timeout),
+                limits=httpx.Limits(max_connections=self._pool_size, max_keepalive_connections=self._pool_size)
+            )
+        return self._async_client
+
+
+rentcast_client = RentcastClient(
+    connect_timeout=api_settings.RENTCAST_CONNECT_TIMEOUT,
+    read_timeout=api_settings.RENTCAST_READ_TIMEOUT,
+    rate=api_settings.RENTCAST_RATE_LIMIT,
+    burst=api_settings.RENTCAST_RATE_BURST,
+    max_retries=api_settings.RENTCAST_MAX_RETRIES,
+    backoff_base=api_settings.RENTCAST_BACKOFF_BASE,
+    backoff_max=api_settings.RENTCAST_BACKOFF_MAX,
+    failure_threshold=api_settings.RENTCAST_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=api_settings.RENTCAST_CIRCUIT_RESET_TIMEOUT,
+    pool_size=api_settings.RENTCAST_FETCH_MAX_IN_FLIGHT
+)
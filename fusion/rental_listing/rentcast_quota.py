@@ -0,0 +1,85 @@
+import logging
+from db.constants import execute_returning
+
+logger = logging.getLogger(__name__)
+
+RENTCAST_STATS_ID = 1
+
+# Reserves up to %(pages)s calls and the matching offset range in one statement. The row lock taken
+# by the subquery makes concurrent reservations queue up and each see the previous one's result, so
+# every run gets a disjoint range of offsets. A passed payment date starts a new billing period.
+RESERVE_PAGES_QUERY = """
+UPDATE rentcast_stats AS stats SET
+    api_calls_number = CASE WHEN reservation.new_period
+        THEN reservation.pages
+        ELSE stats.api_calls_number + reservation.pages END,
+    next_payment_date = CASE WHEN reservation.new_period
+        THEN (stats.next_payment_date::date + INTERVAL '1 month')::date
+        ELSE stats.next_payment_date::date END,
+    offset_value = stats.offset_value + reservation.pages * stats.limit_value
+FROM (
+    SELECT
+        id,
+        next_payment_date::date < CURRENT_DATE AS new_period,
+        CASE WHEN next_payment_date::date < CURRENT_DATE
+            THEN LEAST(%(pages)s, api_calls_max_number)
+            ELSE GREATEST(0, LEAST(%(pages)s, api_calls_max_number - api_calls_number)) END AS pages
+    FROM rentcast_stats
+    WHERE id = %(id)s
+    FOR UPDATE
+) AS reservation
+WHERE stats.id = reservation.id
+RETURNING
+    reservation.pages AS pages,
+    stats.offset_value - reservation.pages * stats.limit_value AS start_offset,
+    stats.limit_value AS limit_value,
+    stats.next_payment_date::date AS next_payment_date,
+    stats.api_calls_number AS api_calls_number
+"""
+
+# Gives back calls that were reserved but not spent, or charges the retries answered beyond the
+# reservation (only within the same billing period), and moves the offset back to the end of the
+# pages actually ingested, unless another run has reserved past it.
+SETTLE_RESERVATION_QUERY = """
+UPDATE rentcast_stats SET
+    api_calls_number = CASE WHEN next_payment_date::date = %(next_payment_date)s::date
+        THEN GREATEST(api_calls_number - %(unused_calls)s, 0)
+        ELSE api_calls_number END,
+    offset_value = CASE WHEN offset_value = %(reserved_end)s
+        THEN %(ingested_end)s
+        ELSE offset_value END
+WHERE id = %(id)s
+RETURNING offset_value, api_calls_number
+"""
+
+
+def reserve_pages(pages):
+    reservation = execute_returning(RESERVE_PAGES_QUERY, {"pages": pages, "id": RENTCAST_STATS_ID})
+    if reservation is None:
+        raise Exception(f"rentcast_stats row {RENTCAST_STATS_ID} not found")
+
+    logger.debug(f"reserved rentcast pages: {reservation}")
+    return reservation
+
+
+def settle_reservation(reservation, calls, advanced_pages):
+    limit = reservation["limit_value"]
+    reserved_end = reservation["start_offset"] + reservation["pages"] * limit
+    ingested_end = reservation["start_offset"] + advanced_pages * limit
+    unused_calls = reservation["pages"] - calls
+    if unused_calls == 0 and ingested_end == reserved_end:
+        return
+
+    stats = execute_returning(SETTLE_RESERVATION_QUERY, {
+        "id": RENTCAST_STATS_ID,
+        "next_payment_date": reservation["next_payment_date"],
+        "unused_calls": unused_calls,
+        "reserved_end": reserved_end,
+        "ingested_end": ingested_end,
+    })
+    if ingested_end != reserved_end and stats["offset_value"] != ingested_end:
+        logger.warning(
+            f"Offsets {ingested_end}-{reserved_end} were not ingested and could not be released "
+            f"because a concurrent run already reserved past them"
+        )
+    logger.debug(f"settled rentcast reservation: {stats}")
@@ -0,0 +1,38 @@
+import logging
+from pipeline.operation import Operation
+from pipeline.chunking import chunked
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayFetchOper(Operation):
+    def __init__(self, archive, property_type=None, since=None, until=None, latest=True):
+        super().__init__()
+        self._archive = archive
+        self._property_type = property_type
+        self._since = since
+        self._until = until
+        self._latest = latest
+
+    def run(self, input=None):
+        output = list(self._iter_listings())
+        return output
+
+    def stream(self, input_chunks):
+        chunk_size = self.get_context_value("chunk_size")
+        for chunk in input_chunks:
+            yield from chunked(self._iter_listings(), chunk_size)
+
+    async def astream(self, input_chunks):
+        chunk_size = self.get_context_value("chunk_size")
+        async for chunk in input_chunks:
+            for sub_chunk in chunked(await self.arun(chunk), chunk_size):
+                yield sub_chunk
+
+    def _iter_listings(self):
+        entries = self._archive.entries(self._property_type, self._since, self._until, self._latest)
+        if not entries:
+            raise Exception(f"No recorded RentCast payloads for property type {self._property_type}")
+
+        logger.info(f"Replaying {len(entries)} recorded pages ({sum(entry['listings'] for entry in entries)} listings)")
+        yield from self._archive.iter_listings(entries)
@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    def __init__(self, directory, freshness):
+        self._directory = Path(directory)
+        self._freshness = freshness
+
+    def get(self, property_type, limit, offset):
+        path = self._path(property_type, limit, offset)
+        if not path.exists():
+            return None
+
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as cache_file:
+                return json.load(cache_file)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cached response {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def is_fresh(self, entry):
+        return time.time() - entry["storedAt"] <= self._freshness
+
+    def validators(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("lastModified"):
+            headers["If-Modified-Since"] = entry["lastModified"]
+        return headers
+
+    def put(self, property_type, limit, offset, body, etag=None, last_modified=None):
+        entry = {
+            "propertyType": property_type,
+            "limit": limit,
+            "offset": offset,
+            "storedAt": time.time(),
+            "etag": etag,
+            "lastModified": last_modified,
+            "body": body,
+        }
+        self._write(self._path(property_type, limit, offset), entry)
+        return entry
+
+    def touch(self, property_type, limit, offset, entry):
+        entry["storedAt"] = time.time()
+        self._write(self._path(property_type, limit, offset), entry)
+        return entry
+
+    def record_range(self, property_type, limit, offsets):
+        # Remembers which pages the last run ingested, so a repeat run can be served from them
+        # instead of reserving a new offset range
+        self._write(self._range_path(property_type), {
+            "propertyType": property_type,
+            "limit": limit,
+            "offsets": list(offsets),
+            "storedAt": time.time(),
+        })
+
+    def last_range(self, property_type, fresh=True):
+        # The cached bodies of the last ingested range, or None if a page is missing (or stale when fresh)
+        path = self._range_path(property_type)
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as range_file:
+                last_range = json.load(range_file)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cached range {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        pages = []
+        for offset in last_range["offsets"]:
+            entry = self.get(property_type, last_range["limit"], offset)
+            if entry is None or (fresh and not self.is_fresh(entry)):
+                return None
+            pages.append(entry["body"])
+        return pages
+
+    def _write(self, path, entry):
+        self._directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self._directory, prefix=f"{path.name}.", suffix=".tmp", delete=False) as tmp_file:
+            try:
+                with gzip.open(tmp_file, "wt", encoding="utf-8") as cache_file:
+                    json.dump(entry, cache_file)
+            except Exception:
+                tmp_file.close()
+                os.unlink(tmp_file.name)
+                raise
+        os.replace(tmp_file.name, path)
+
+    def _path(self, property_type, limit, offset):
+        key = hashlib.sha1(f"{property_type}|{limit}|{offset}".encode("utf-8")).hexdigest()
+        return self._directory / f"{key}.json.gz"
+
+    def _range_path(self, property_type):
+        key = hashlib.sha1(property_type.encode("utf-8")).hexdigest()
+        return self._directory / f"range_{key}.json.gz"
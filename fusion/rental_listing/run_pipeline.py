@@ -1,16 +1,102 @@
+import asyncio
 from fusion.rental_listing.pipeline import RentalListPipeline
 from fusion.rental_listing.transformation_oper import TransformationOper
 from fusion.rental_listing.fusion_oper import FusionOper
 from fusion.rental_listing.fetch_oper import FetchOper
+from fusion.rental_listing.replay_fetch_oper import ReplayFetchOper
+from fusion.rental_listing.payload_archive import PayloadArchive
 from fusion.rental_listing.modify_batch import ModifyBatch
 from fusion.rental_listing.modify_oper import ModifyOper
+from fusion.rental_listing.api_config import api_settings
+from fusion.rental_listing.response_cache import ResponseCache
+from pipeline.checkpoint import CheckpointStore
+from pipeline.fan_out import FanOut
+from pipeline.pipeline import DEFAULT_CHUNK_SIZE
+from pipeline.profiling import PipelineProfiler
+from db.session import engine
 
-def run_pipeline(property_type):
-    rental_list_pipeline = RentalListPipeline()
+def _build_response_cache():
+    if not api_settings.RENTCAST_RESPONSE_CACHE_DIR:
+        return None
+    return ResponseCache(api_settings.RENTCAST_RESPONSE_CACHE_DIR, api_settings.RENTCAST_RESPONSE_CACHE_FRESHNESS)
 
-    rental_list_pipeline.add_oper(FetchOper(property_type))
-    rental_list_pipeline.add_oper(TransformationOper())
+def _build_fetch_oper(property_type, pages, response_cache):
+    if api_settings.RENTCAST_REPLAY_DIR:
+        return ReplayFetchOper(PayloadArchive(api_settings.RENTCAST_REPLAY_DIR), property_type)
+
+    archive = PayloadArchive(api_settings.RENTCAST_RECORD_DIR) if api_settings.RENTCAST_RECORD_DIR else None
+    return FetchOper(property_type, pages, api_settings.RENTCAST_FETCH_MAX_IN_FLIGHT, response_cache, archive)
+
+def _build_transformation_oper():
+    return TransformationOper(
+        workers=api_settings.PIPELINE_TRANSFORM_WORKERS,
+        shard_size=api_settings.PIPELINE_TRANSFORM_SHARD_SIZE
+    )
+
+def build_pipeline(property_types, pages=None):
+    if isinstance(property_types, str):
+        property_types = [property_types]
+    property_types = list(dict.fromkeys(property_types))
+    if not property_types:
+        raise ValueError("At least one property type is required")
+
+    checkpoint_store = CheckpointStore(
+        api_settings.PIPELINE_CHECKPOINT_DIR,
+        max_age=api_settings.PIPELINE_CHECKPOINT_MAX_AGE,
+        lock_timeout=api_settings.PIPELINE_CHECKPOINT_LOCK_TIMEOUT
+    )
+    pages = pages or api_settings.RENTCAST_FETCH_PAGES
+    response_cache = _build_response_cache()
+    rental_list_pipeline = RentalListPipeline(checkpoint_store, f"rental_listing_{'_'.join(property_types)}")
+
+    if len(property_types) == 1:
+        rental_list_pipeline.add_oper(_build_fetch_oper(property_types[0], pages, response_cache))
+        rental_list_pipeline.add_oper(_build_transformation_oper())
+    else:
+        # Fusion runs after the fan in, so a failed run resumes from the transformed listings
+        rental_list_pipeline.add_oper(FanOut({
+            property_type: [
+                _build_fetch_oper(property_type, pages, response_cache),
+                _build_transformation_oper()
+            ]
+            for property_type in property_types
+        }))
     rental_list_pipeline.add_oper(FusionOper())
-    rental_list_pipeline.add_oper(ModifyBatch(ModifyOper()))
+    rental_list_pipeline.add_oper(ModifyBatch(
+        ModifyOper(),
+        bulk=api_settings.PIPELINE_BULK_WRITE,
+        copy_threshold=api_settings.PIPELINE_COPY_THRESHOLD
+    ))
+
+    return rental_list_pipeline
+
+def run_pipeline(property_types, chunk_size=None, queue_size=None, profile=False, pages=None):
+    if profile and (chunk_size or queue_size):
+        raise ValueError("Profiling is only supported for non-streaming runs")
+
+    rental_list_pipeline = build_pipeline(property_types, pages)
+
+    if profile:
+        return rental_list_pipeline.run(profiler=PipelineProfiler(api_settings.PIPELINE_PROFILE_DIR, engines=[engine]))
+
+    if queue_size:
+        chunks = rental_list_pipeline.stream_staged(chunk_size=chunk_size or DEFAULT_CHUNK_SIZE, queue_size=queue_size)
+        return [elem for chunk in chunks for elem in chunk]
+
+    if chunk_size:
+        return [elem for chunk in rental_list_pipeline.stream(chunk_size=chunk_size) for elem in chunk]
+
+    return rental_list_pipeline.run()
+
+async def arun_pipeline(property_types, chunk_size=None, queue_size=None, profile=False, pages=None):
+    if queue_size or profile:
+        # Staged mode drives its own worker threads and cProfile only sees the calling
+        # thread, so both run synchronously while the event loop waits for the result.
+        return await asyncio.to_thread(run_pipeline, property_types, chunk_size, queue_size, profile, pages)
+
+    rental_list_pipeline = build_pipeline(property_types, pages)
+
+    if chunk_size:
+        return [elem async for chunk in rental_list_pipeline.astream(chunk_size=chunk_size) for elem in chunk]
 
-    return rental_list_pipeline.run()
\ No newline at end of file
+    return await rental_list_pipeline.arun()
@@ -1,6 +1,6 @@
 from enum import Enum
-from pydantic import BaseModel, Field, EmailStr, field_serializer, field_validator
-from typing import Optional, Dict
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, TypeAdapter, WrapValidator, field_serializer, field_validator
+from typing import Annotated, Optional, Dict, List
 from datetime import datetime
 from entities.common.enums import ListingStatusEnum, ListingTypeEnum
 
@@ -30,7 +30,13 @@ class HistoryItem(BaseModel):
     removedDate: Optional[datetime] = None
     daysOnMarket: Optional[int] = None
     
+# Accepted in the payload but not taken into the model (temporary)
+IgnoredOnInput = WrapValidator(lambda value, handler: None)
+
 class PropertyListing(BaseModel):
+    # Address parts, builder and coordinates in the payload are dropped as unknown fields
+    model_config = ConfigDict(extra="ignore")
+
     rentcastId: str = Field(alias="id")
     interiorEntityKey: str = Field(default=None, alias="formattedAddress")
     county: Optional[str] = None
@@ -44,10 +50,10 @@ class PropertyListing(BaseModel):
     status: Optional[ListingStatusEnum] = None
     price: Optional[float] = None
     listingType: Optional[str] = None
-    listedDate: Optional[datetime] = None
-    removedDate: Optional[datetime] = None
-    createdDate: Optional[datetime] = None
-    lastSeenDate: Optional[datetime] = None
+    listedDate: Annotated[Optional[datetime], IgnoredOnInput] = None
+    removedDate: Annotated[Optional[datetime], IgnoredOnInput] = None
+    createdDate: Annotated[Optional[datetime], IgnoredOnInput] = None
+    lastSeenDate: Annotated[Optional[datetime], IgnoredOnInput] = None
     daysOnMarket: Optional[int] = None
     mlsName: Optional[str] = None
     mlsNumber: Optional[str] = None
@@ -74,19 +80,8 @@ class PropertyListing(BaseModel):
         return round(value * 0.092903, 2)
 
 
+property_listings_adapter = TypeAdapter(List[PropertyListing])
 
+property_listing_transform = lambda property_listing: PropertyListing.model_validate(property_listing)
 
-def filter_fields(property_listing):
-    exclude_fields = { "addressLine1", "addressLine2", "city", "state", "zipCode",  "builder", "latitude", "longitude",
-                        "listedDate", "removedDate", "createdDate", "lastSeenDate"    # temporary
-                      }
-
-    filtered_fields = {
-        field: value for field, value in property_listing.items() if field not in exclude_fields
-    }
-
-    return filtered_fields
-
-
-property_listing_transform = lambda property_listing: PropertyListing.model_validate(filter_fields(property_listing))
-
+property_listings_transform = lambda property_listings: property_listings_adapter.validate_python(property_listings)
@@ -1,13 +1,36 @@
+import json
 import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pydantic import ValidationError
 from pipeline.operation import Operation
-from fusion.rental_listing.transformation import property_listing_transform
+from fusion.rental_listing.transformation import property_listing_transform, property_listings_transform
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SHARD_SIZE = 1000
+
+
+def _validate_shard(payload):
+    return TransformationOper()._validate(json.loads(payload))
+
+
 class TransformationOper(Operation):
-    def __init__(self):
+    # Worker processes are spawned once and shared by all runs; spawning rather than forking keeps
+    # them from inheriting the server's threads and connection pools.
+    _process_pool = None
+    _process_pool_workers = None
+    _process_pool_lock = threading.Lock()
+
+    def __init__(self, workers=0, shard_size=DEFAULT_SHARD_SIZE):
         super().__init__()  
+        if workers < 0:
+            raise ValueError(f"workers must be a non-negative integer, got {workers}")
+        if shard_size < 1:
+            raise ValueError(f"shard_size must be a positive integer, got {shard_size}")
+        self._workers = workers
+        self._shard_size = shard_size
 
     def _serialize_pydantic_error(self, validation_error):
         def clean_error(err):
@@ -25,23 +48,10 @@ class TransformationOper(Operation):
     def run(self, input=None):
         property_listing = input
 
-        validated_listings = []
-        errors = []
+        validated_listings, errors = self._transform_all(property_listing)
 
-        for item in property_listing:
-            try:
-                listing = property_listing_transform(item)
-                validated_listings.append(listing)
-            except ValidationError as e:
-                errors.append({
-                    "id": item.get("id"),
-                    "errors": self._serialize_pydantic_error(e)
-                })
-            except Exception as e:
-                errors.append({
-                    "id": item.get("id"),
-                    "error": str(e)  
-                })
+        error_count_key = f"{self.__class__.__name__}_errors"
+        self.set_context_value(error_count_key, (self.get_context_value(error_count_key) or 0) + len(errors))
 
         logger.info(f"validated: {len(validated_listings)} listings")
         if errors:
@@ -51,6 +61,91 @@ class TransformationOper(Operation):
 
         return output
 
+    def _transform_all(self, items):
+        listings, errors = self._validate_sharded(items)
+        output = [listing for listing in listings if listing is not None]
+        return output, errors
+
+    def _validate_sharded(self, items):
+        if self._workers < 2 or len(items) <= self._shard_size:
+            return self._validate(items)
 
+        # Shards travel to the workers as JSON bytes, which is cheaper to pickle than nested dicts
+        shards = [
+            json.dumps(items[start:start + self._shard_size]).encode("utf-8")
+            for start in range(0, len(items), self._shard_size)
+        ]
+        listings = []
+        errors = []
+        for shard_listings, shard_errors in self._get_process_pool().map(_validate_shard, shards):
+            listings.extend(shard_listings)
+            errors.extend(shard_errors)
+
+        logger.debug(f"validated {len(items)} listings in {len(shards)} shards on {self._workers} processes")
+        return listings, errors
+
+    @classmethod
+    def shutdown_process_pool(cls):
+        with cls._process_pool_lock:
+            if cls._process_pool is not None:
+                cls._process_pool.shutdown()
+                cls._process_pool = None
+
+    def _get_process_pool(self):
+        cls = self.__class__
+        with cls._process_pool_lock:
+            if cls._process_pool is None or cls._process_pool_workers != self._workers:
+                if cls._process_pool is not None:
+                    cls._process_pool.shutdown(wait=False)
+                cls._process_pool = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                cls._process_pool_workers = self._workers
+            return cls._process_pool
+
+    def _validate(self, items):
+        # One bulk pass over the whole page; when it fails, the offending items are singled out from
+        # the error locations and the rest is validated again in bulk. Returns listings aligned with
+        # items, with None where validation failed.
+        try:
+            return property_listings_transform(items), []
+        except ValidationError as e:
+            failed = {}
+            for err in self._serialize_pydantic_error(e):
+                index, *loc = err["loc"]
+                err["loc"] = tuple(loc)
+                failed.setdefault(index, []).append(err)
+        except Exception:
+            errors = []
+            return self._validate_each(items, errors), errors
+
+        errors = [self._error_entry(items[index], errors=item_errors) for index, item_errors in sorted(failed.items())]
+        remaining = [index for index in range(len(items)) if index not in failed]
+        listings = [None] * len(items)
+        try:
+            validated = property_listings_transform([items[index] for index in remaining])
+        except ValidationError:
+            validated = self._validate_each([items[index] for index in remaining], errors)
 
+        for index, listing in zip(remaining, validated):
+            listings[index] = listing
+        return listings, errors
+
+    def _validate_each(self, items, errors):
+        listings = []
+        for item in items:
+            listing = None
+            try:
+                listing = property_listing_transform(item)
+            except ValidationError as e:
+                errors.append(self._error_entry(item, errors=self._serialize_pydantic_error(e)))
+            except Exception as e:
+                errors.append(self._error_entry(item, error=str(e)))
+            listings.append(listing)
+        return listings
 
+    def _error_entry(self, item, **details):
+        entry = {"id": item.get("id") if isinstance(item, dict) else None}
+        entry.update(details)
+        return entry
@@ -0,0 +1,29 @@
+"""add sourceFingerprint to home_docs
+
+Revision ID: 28fbba583383
+Revises: c48a6436086c
+Create Date: 2026-10-17 19:02:11.481302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '28fbba583383'
+down_revision: Union[str, Sequence[str], None] = 'c48a6436086c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('home_docs', sa.Column('sourceFingerprint', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('home_docs', 'sourceFingerprint')
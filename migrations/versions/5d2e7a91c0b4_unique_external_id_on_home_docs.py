@@ -0,0 +1,33 @@
+"""make home_docs externalId unique
+
+Revision ID: 5d2e7a91c0b4
+Revises: 28fbba583383
+Create Date: 2026-10-17 21:14:37.902144
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e7a91c0b4'
+down_revision: Union[str, Sequence[str], None] = '28fbba583383'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bulk writes upsert residences with ON CONFLICT ("externalId"), which needs a unique index to infer.
+    # Fails if duplicate external ids already exist; they have to be merged by hand first.
+    op.drop_index(op.f('ix_home_docs_externalId'), table_name='home_docs')
+    op.create_index(op.f('ix_home_docs_externalId'), 'home_docs', ['externalId'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_home_docs_externalId'), table_name='home_docs')
+    op.create_index(op.f('ix_home_docs_externalId'), 'home_docs', ['externalId'], unique=False)
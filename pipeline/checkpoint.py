@@ -0,0 +1,143 @@
+import asyncio
+import fcntl
+import logging
+import os
+import pickle
+import re
+import tempfile
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+LOCK_POLL_INTERVAL = 0.1
+
+
+class CheckpointStore:
+    def __init__(self, directory, max_age=None, lock_timeout=None):
+        self._directory = Path(directory)
+        self._max_age = max_age
+        self._lock_timeout = lock_timeout
+
+    def save(self, key, stage_index, stage_name, output, context):
+        self._directory.mkdir(parents=True, exist_ok=True)
+        checkpoint = {
+            "stage_index": stage_index,
+            "stage_name": stage_name,
+            "output": output,
+            "context": self._picklable_context(context),
+            "created_at": time.time(),
+        }
+
+        # Every writer gets its own temp file, so a concurrent save can never replace it from under us
+        path = self._path(key)
+        with tempfile.NamedTemporaryFile(dir=self._directory, prefix=f"{path.stem}.", suffix=".tmp", delete=False) as checkpoint_file:
+            try:
+                pickle.dump(checkpoint, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                checkpoint_file.close()
+                os.unlink(checkpoint_file.name)
+                raise
+        os.replace(checkpoint_file.name, path)
+
+        logger.debug(f"Saved checkpoint for {key} after stage {stage_index} ({stage_name})")
+
+    def load(self, key):
+        path = self._path(key)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, "rb") as checkpoint_file:
+                checkpoint = pickle.load(checkpoint_file)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable checkpoint {path}: {e}")
+            self.clear(key)
+            return None
+
+        if self._max_age is not None and time.time() - checkpoint["created_at"] > self._max_age:
+            logger.info(f"Discarding expired checkpoint for {key}")
+            self.clear(key)
+            return None
+
+        return checkpoint
+
+    def clear(self, key):
+        self._path(key).unlink(missing_ok=True)
+
+    def lock(self, key):
+        # Held by a run from load() through clear(), so two runs for the same key never resume
+        # the same checkpoint
+        return CheckpointLock(self._path(key).with_suffix(".lock"), self._lock_timeout)
+
+    def _path(self, key):
+        file_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", key)
+        return self._directory / f"{file_name}.pkl"
+
+    def _picklable_context(self, context):
+        picklable = {}
+        for key, value in context.items():
+            try:
+                pickle.dumps(value)
+            except Exception:
+                continue
+            picklable[key] = value
+        return picklable
+
+
+class CheckpointLock:
+    # flock is polled without blocking, so a waiter gives up after the timeout and an async waiter can be
+    # cancelled between attempts without ever taking the lock
+    def __init__(self, path, timeout=None):
+        self._path = path
+        self._timeout = timeout
+        self._file = None
+
+    def acquire(self):
+        deadline = self._deadline()
+        while not self.try_acquire():
+            self._check_deadline(deadline)
+            time.sleep(LOCK_POLL_INTERVAL)
+
+    async def aacquire(self):
+        deadline = self._deadline()
+        while not self.try_acquire():
+            self._check_deadline(deadline)
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+    def try_acquire(self):
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self._path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        except Exception:
+            lock_file.close()
+            raise
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def _deadline(self):
+        return None if self._timeout is None else time.monotonic() + self._timeout
+
+    def _check_deadline(self, deadline):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise TimeoutError(f"Timed out after {self._timeout}s waiting for checkpoint lock {self._path}")
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
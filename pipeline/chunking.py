@@ -0,0 +1,13 @@
+from itertools import islice
+
+
+def chunked(items, chunk_size):
+    if chunk_size is None or chunk_size < 1:
+        raise ValueError(f"chunk_size must be a positive integer, got {chunk_size}")
+
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
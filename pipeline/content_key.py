@@ -0,0 +1,10 @@
+import hashlib
+import json
+
+
+def content_key(value):
+    if hasattr(value, "model_dump_json"):
+        payload = value.model_dump_json(by_alias=True)
+    else:
+        payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
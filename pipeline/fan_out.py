@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pipeline.operation import Operation
+from pipeline.stage_worker import POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class FanOut(Operation):
+    def __init__(self, branches, max_workers=None):
+        super().__init__()
+        if not isinstance(branches, dict) or len(branches) == 0:
+            raise TypeError(f"branches must be a non empty dictionary of name to operations list, got {type(branches).__name__}")
+        for name, operations in branches.items():
+            for operation in operations:
+                if not isinstance(operation, Operation):
+                    raise TypeError(f"branch {name} operation must be an instance of Operation, got {type(operation).__name__}")
+
+        self._branches = branches
+        self._max_workers = max_workers
+
+    def run(self, input=None):
+        start = time.perf_counter()
+        base_context = self._branch_context()
+        with ThreadPoolExecutor(max_workers=self._max_workers or len(self._branches)) as executor:
+            futures = {
+                name: executor.submit(self._run_branch, operations, input)
+                for name, operations in self._branches.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+
+        return self._fan_in(results, base_context, time.perf_counter() - start)
+
+    async def arun(self, input=None):
+        start = time.perf_counter()
+        base_context = self._branch_context()
+        outputs = await asyncio.gather(*[
+            self._arun_branch(operations, input) for operations in self._branches.values()
+        ])
+        results = dict(zip(self._branches.keys(), outputs))
+
+        return self._fan_in(results, base_context, time.perf_counter() - start)
+
+    def stream(self, input_chunks):
+        # Every branch streams its chunks in its own thread into one bounded queue, so memory stays bounded
+        # by the chunk size instead of by a branch's whole output
+        for chunk in input_chunks:
+            yield from self._stream_branches(chunk)
+
+    async def astream(self, input_chunks):
+        async for chunk in input_chunks:
+            async for branch_chunk in self._astream_branches(chunk):
+                yield branch_chunk
+
+    def _stream_branches(self, input):
+        start = time.perf_counter()
+        base_context = self._branch_context()
+        chunks = queue.Queue(maxsize=len(self._branches))
+        stop_event = threading.Event()
+        results = {}
+        threads = [
+            threading.Thread(
+                target=self._stream_branch,
+                args=(name, operations, input, chunks, stop_event, results),
+                name=f"fan-out-{name}",
+                daemon=True
+            )
+            for name, operations in self._branches.items()
+        ]
+        for thread in threads:
+            thread.start()
+
+        elements = 0
+        try:
+            remaining = len(threads)
+            while remaining:
+                kind, value = chunks.get()
+                if kind == "error":
+                    raise value
+                if kind == "end":
+                    remaining -= 1
+                    continue
+                elements += self._count_elements(value)
+                yield value
+        finally:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        self._merge_branches(results, base_context)
+        logger.info(f"Fan out of {len(results)} branches streamed {elements} elements in {time.perf_counter() - start:.2f}s")
+
+    def _stream_branch(self, name, operations, input, chunks, stop_event, results):
+        context = self._branch_context()
+        start = time.perf_counter()
+        try:
+            branch_chunks = iter([input])
+            for operation in operations:
+                operation.set_context(context)
+                branch_chunks = operation.stream(branch_chunks)
+            for chunk in branch_chunks:
+                if not self._put(chunks, ("chunk", chunk), stop_event):
+                    return
+            results[name] = (context, time.perf_counter() - start)
+            self._put(chunks, ("end", None), stop_event)
+        except Exception as e:
+            self._put(chunks, ("error", e), stop_event)
+
+    def _put(self, chunks, item, stop_event):
+        # Polls so a branch blocked on a full queue notices when the consumer has stopped
+        while not stop_event.is_set():
+            try:
+                chunks.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def _astream_branches(self, input):
+        start = time.perf_counter()
+        base_context = self._branch_context()
+        chunks = asyncio.Queue(maxsize=len(self._branches))
+        results = {}
+        tasks = [
+            asyncio.create_task(self._astream_branch(name, operations, input, chunks, results))
+            for name, operations in self._branches.items()
+        ]
+
+        elements = 0
+        try:
+            remaining = len(tasks)
+            while remaining:
+                kind, value = await chunks.get()
+                if kind == "error":
+                    raise value
+                if kind == "end":
+                    remaining -= 1
+                    continue
+                elements += self._count_elements(value)
+                yield value
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self._merge_branches(results, base_context)
+        logger.info(f"Fan out of {len(results)} branches streamed {elements} elements in {time.perf_counter() - start:.2f}s")
+
+    async def _astream_branch(self, name, operations, input, chunks, results):
+        context = self._branch_context()
+        start = time.perf_counter()
+
+        async def source():
+            yield input
+
+        try:
+            branch_chunks = source()
+            for operation in operations:
+                operation.set_context(context)
+                branch_chunks = operation.astream(branch_chunks)
+            async for chunk in branch_chunks:
+                await chunks.put(("chunk", chunk))
+            results[name] = (context, time.perf_counter() - start)
+            await chunks.put(("end", None))
+        except Exception as e:
+            await chunks.put(("error", e))
+
+    def _run_branch(self, operations, input):
+        context = self._branch_context()
+        start = time.perf_counter()
+        cur = input
+        for operation in operations:
+            operation.set_context(context)
+            cur = operation.run(cur)
+            context = operation.get_context()
+        return cur, context, time.perf_counter() - start
+
+    async def _arun_branch(self, operations, input):
+        context = self._branch_context()
+        start = time.perf_counter()
+        cur = input
+        for operation in operations:
+            operation.set_context(context)
+            cur = await operation.arun(cur)
+            context = operation.get_context()
+        return cur, context, time.perf_counter() - start
+
+    def _branch_context(self):
+        return {key: dict(value) if isinstance(value, dict) else value for key, value in self._context.items()}
+
+    def _fan_in(self, results, base_context, duration):
+        output = list()
+        for branch_output, _, _ in results.values():
+            output.extend(branch_output)
+        self._merge_branches(
+            {name: (branch_context, branch_duration) for name, (_, branch_context, branch_duration) in results.items()},
+            base_context
+        )
+
+        logger.info(f"Fan out of {len(results)} branches produced {len(output)} elements in {duration:.2f}s")
+        return output
+
+    def _merge_branches(self, results, base_context):
+        subphases = {}
+        errors = 0
+
+        for name, (branch_context, branch_duration) in results.items():
+            subphases[name] = branch_duration
+            for key, value in branch_context.items():
+                if key.endswith("_errors") and isinstance(value, int):
+                    errors += value - (base_context.get(key) or 0)
+            self._merge_context(self._context, base_context, branch_context)
+
+        op_name = self.__class__.__name__
+        self.set_context_value(f"{op_name}_subphases", subphases)
+        self.set_context_value(f"{op_name}_errors", errors)
+
+    def _count_elements(self, chunk):
+        try:
+            return len(chunk)
+        except TypeError:
+            return 0
+
+    def _merge_context(self, target, base, source):
+        # Branches start from a copy of the same context: numeric values they changed are
+        # merged as deltas so parallel counters and timings add up, anything else is overwritten.
+        for key, value in source.items():
+            base_value = base.get(key)
+            if value is base_value or value == base_value:
+                continue
+
+            current = target.get(key)
+            if isinstance(value, dict) and isinstance(current, dict):
+                merged = dict(current)
+                self._merge_context(merged, base_value if isinstance(base_value, dict) else {}, value)
+                target[key] = merged
+            elif self._is_number(value) and self._is_number(current):
+                target[key] = current + value - (base_value if self._is_number(base_value) else 0)
+            else:
+                target[key] = value
+
+    def _is_number(self, value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
@@ -0,0 +1,93 @@
+import codecs
+import json
+
+READ_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789+-.eE"
+
+
+class JsonArrayParser:
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._state = "start"
+
+    def feed(self, data, final=False):
+        if isinstance(data, bytes):
+            data = self._text_decoder.decode(data, final)
+        self._buffer = self._buffer[self._position:] + data
+        self._position = 0
+
+        items = []
+        while True:
+            self._skip_whitespace()
+            if self._position >= len(self._buffer):
+                break
+            char = self._buffer[self._position]
+
+            if self._state == "start":
+                if char != "[":
+                    raise ValueError(f"Expected a JSON array, got {char!r}")
+                self._position += 1
+                self._state = "first"
+            elif self._state == "separator" or (self._state == "first" and char == "]"):
+                if char == "]":
+                    self._position += 1
+                    self._state = "done"
+                elif char == ",":
+                    self._position += 1
+                    self._state = "value"
+                else:
+                    raise ValueError(f"Expected ',' or ']' at position {self._position}, got {char!r}")
+            elif self._state in ("first", "value"):
+                try:
+                    item, end = self._decoder.raw_decode(self._buffer, self._position)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break
+                # A number at the end of the buffer may continue in the next chunk, even when it parsed
+                # short of the end ("1" out of a trailing "1." or "1e")
+                if not final and self._buffer[end - 1] not in '}]"' and not self._buffer[end:].strip(_NUMBER_CHARS):
+                    break
+                items.append(item)
+                self._position = end
+                self._state = "separator"
+            else:
+                raise ValueError(f"Unexpected data after the JSON array at position {self._position}")
+
+        return items
+
+    def close(self):
+        items = self.feed(b"", final=True)
+        if self._state != "done":
+            raise ValueError("Incomplete JSON array")
+        return items
+
+    def _skip_whitespace(self):
+        while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+            self._position += 1
+
+
+def iter_json_array(byte_chunks):
+    parser = JsonArrayParser()
+    for chunk in byte_chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_json_array(byte_chunks):
+    parser = JsonArrayParser()
+    async for chunk in byte_chunks:
+        for item in parser.feed(chunk):
+            yield item
+    for item in parser.close():
+        yield item
+
+
+def iter_json_file(path, read_size=READ_SIZE):
+    with open(path, "rb") as json_file:
+        yield from iter_json_array(iter(lambda: json_file.read(read_size), b""))
@@ -0,0 +1,187 @@
+import math
+import threading
+import time
+from collections import deque, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+DEFAULT_MAX_RUNS = 200
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, math.inf)
+QUANTILES = (0.5, 0.9, 0.99)
+TOTAL_PHASE = "total"
+
+
+@dataclass
+class StageTiming:
+    name: str
+    duration: Optional[float]
+    subphases: Optional[Dict[str, float]] = None
+    elements: Optional[int] = None
+    errors: int = 0
+    queue: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class RunRecord:
+    pipeline: str
+    status: str
+    duration: float
+    finished_at: float
+    stages: List[StageTiming] = field(default_factory=list)
+
+
+def _percentile(sorted_values, quantile):
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(quantile * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def _stats(values):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return {"count": 0}
+
+    stats = {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "max": values[-1],
+    }
+    for quantile in QUANTILES:
+        stats[f"p{int(quantile * 100)}"] = _percentile(values, quantile)
+    return stats
+
+
+def _format_labels(labels):
+    return ",".join(f'{key}="{str(value)}"' for key, value in labels)
+
+
+class _Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(DURATION_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                self.bucket_counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsStore:
+    def __init__(self, max_runs=DEFAULT_MAX_RUNS):
+        self._runs = deque(maxlen=max_runs)
+        # Histograms and counters are cumulative since process start, as Prometheus expects;
+        # percentiles are computed over the rolling window of recent runs.
+        self._histograms = defaultdict(_Histogram)
+        self._counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def record_run(self, pipeline, stages, status, duration=None):
+        if duration is None:
+            duration = sum(stage.duration or 0.0 for stage in stages)
+        run = RunRecord(
+            pipeline=pipeline,
+            status=status,
+            duration=duration,
+            finished_at=time.time(),
+            stages=list(stages)
+        )
+
+        with self._lock:
+            self._runs.append(run)
+            self._counters[("pipeline_runs_total", (("pipeline", pipeline), ("status", status)))] += 1
+            self._histograms[("pipeline_run_duration_seconds", (("pipeline", pipeline),))].observe(duration)
+
+            for stage in run.stages:
+                labels = (("pipeline", pipeline), ("operation", stage.name))
+                if stage.elements is not None:
+                    self._counters[("pipeline_operation_elements_total", labels)] += stage.elements
+                self._counters[("pipeline_operation_errors_total", labels)] += stage.errors
+                for phase, phase_duration in self._phases(stage):
+                    self._histograms[("pipeline_operation_duration_seconds", labels + (("phase", phase),))].observe(phase_duration)
+
+        return run
+
+    def runs(self, limit=None):
+        with self._lock:
+            runs = list(self._runs)
+        return runs[-limit:] if limit else runs
+
+    def summary(self):
+        runs = self.runs()
+
+        run_durations = defaultdict(list)
+        run_statuses = defaultdict(lambda: defaultdict(int))
+        phase_durations = defaultdict(list)
+        elements = defaultdict(int)
+        errors = defaultdict(int)
+
+        for run in runs:
+            run_durations[run.pipeline].append(run.duration)
+            run_statuses[run.pipeline][run.status] += 1
+            for stage in run.stages:
+                key = (run.pipeline, stage.name)
+                elements[key] += stage.elements or 0
+                errors[key] += stage.errors
+                for phase, phase_duration in self._phases(stage):
+                    phase_durations[key + (phase,)].append(phase_duration)
+
+        return {
+            "windowRuns": len(runs),
+            "pipelines": [
+                {
+                    "pipeline": pipeline,
+                    "statuses": dict(run_statuses[pipeline]),
+                    "duration": _stats(durations),
+                }
+                for pipeline, durations in run_durations.items()
+            ],
+            "operations": [
+                {
+                    "pipeline": pipeline,
+                    "operation": operation,
+                    "phase": phase,
+                    "duration": _stats(durations),
+                    "elements": elements[(pipeline, operation)] if phase == TOTAL_PHASE else None,
+                    "errors": errors[(pipeline, operation)] if phase == TOTAL_PHASE else None,
+                }
+                for (pipeline, operation, phase), durations in phase_durations.items()
+            ],
+        }
+
+    def to_prometheus(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h.bucket_counts), h.sum, h.count) for key, h in self._histograms.items()}
+
+        lines = []
+        for metric_name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {metric_name} counter")
+            for (name, labels), value in counters.items():
+                if name == metric_name:
+                    lines.append(f"{name}{{{_format_labels(labels)}}} {value}")
+
+        for metric_name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {metric_name} histogram")
+            for (name, labels), (bucket_counts, total, count) in histograms.items():
+                if name != metric_name:
+                    continue
+                for bound, bucket_count in zip(DURATION_BUCKETS, bucket_counts):
+                    le = "+Inf" if bound == math.inf else str(bound)
+                    lines.append(f"{name}_bucket{{{_format_labels(labels + (('le', le),))}}} {bucket_count}")
+                lines.append(f"{name}_sum{{{_format_labels(labels)}}} {total}")
+                lines.append(f"{name}_count{{{_format_labels(labels)}}} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def _phases(self, stage):
+        if stage.duration is not None:
+            yield TOTAL_PHASE, stage.duration
+        for phase, phase_duration in (stage.subphases or {}).items():
+            yield phase, phase_duration
+
+
+pipeline_metrics = MetricsStore()
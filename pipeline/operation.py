@@ -1,5 +1,11 @@
+import asyncio
+
+
 
 class Operation:
+    # Whether Pipeline.run may checkpoint this operation's output and resume from it
+    checkpointed = True
+
     def __init__(self):
         self._context = dict()
 
@@ -9,6 +15,17 @@ class Operation:
         output = data
         return output
 
+    def stream(self, input_chunks):
+        for chunk in input_chunks:
+            yield self.run(chunk)
+
+    async def arun(self, input=None):
+        return await asyncio.to_thread(self.run, input)
+
+    async def astream(self, input_chunks):
+        async for chunk in input_chunks:
+            yield await self.arun(chunk)
+
     def get_context(self):
         return self._context
 
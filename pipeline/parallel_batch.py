@@ -0,0 +1,82 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from pipeline.batch import Batch
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_TYPES = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+def _timed_run(operation, elem):
+    # The exception itself is returned, so the caller can re-raise it with its traceback
+    start = time.perf_counter()
+    try:
+        output = operation.run(elem)
+        error = None
+    except Exception as e:
+        output = None
+        error = e
+    return output, time.perf_counter() - start, error
+
+
+class ParallelBatch(Batch):
+    def __init__(self, operation, max_workers=None, executor_type="thread", raise_on_error=True, chunksize=1, name=None):
+        super().__init__(operation)
+        if executor_type not in EXECUTOR_TYPES:
+            raise ValueError(f"executor_type must be one of {list(EXECUTOR_TYPES)}, got {executor_type}")
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f"max_workers must be a positive integer, got {max_workers}")
+
+        self._max_workers = max_workers
+        self._executor_type = executor_type
+        self._raise_on_error = raise_on_error
+        self._chunksize = chunksize
+        self._name = name or self.__class__.__name__
+
+    def run(self, input):
+        data = input
+        if not isinstance(data, list):
+            raise TypeError(f"data at Batch must be a list, got {type(data).__name__}")
+
+        output = list()
+        elements = list()
+        errors = list()
+
+        # With a process pool the operation is pickled to the workers, so context
+        # values it sets while running are not visible to the pipeline.
+        executor_cls = EXECUTOR_TYPES[self._executor_type]
+        with executor_cls(max_workers=self._max_workers) as executor:
+            results = executor.map(partial(_timed_run, self._operation), data, chunksize=self._chunksize)
+
+            for index, (result, duration, error) in enumerate(results):
+                # Failed elements keep their exception in place of a result when errors do not raise
+                output.append(result if error is None else error)
+                elements.append({
+                    "index": index,
+                    "duration": duration,
+                    "error": f"{type(error).__name__}: {error}" if error is not None else None,
+                })
+                if error is not None:
+                    errors.append(error)
+
+        durations = [elem["duration"] for elem in elements]
+
+        self.set_context_value(f"{self._name}_elements", elements)
+        self.set_context_value(f"{self._name}_errors", len(errors))
+        self.set_context_value(f"{self._name}_subphases", {
+            "elements_total": sum(durations),
+            "element_max": max(durations, default=0.0),
+        })
+
+        if errors:
+            failures = [elem for elem in elements if elem["error"]]
+            logger.error(f"{len(errors)} of {len(data)} elements failed: {failures}")
+            if self._raise_on_error:
+                raise errors[0]
+
+        return output
@@ -1,12 +1,24 @@
+import asyncio
 import logging
+import queue
+import threading
 import time
 from pipeline.operation import Operation
+from pipeline.chunking import chunked
+from pipeline.metrics import StageTiming, pipeline_metrics
+from pipeline.stage_worker import StageWorker, StageStopped, END_OF_STREAM, get_chunk
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_QUEUE_SIZE = 2
+
 class Pipeline:
-    def __init__(self):
+    def __init__(self, checkpoint_store=None, checkpoint_key=None):
         self._operations = list()
+        self._checkpoint_store = checkpoint_store
+        self._checkpoint_key = checkpoint_key or self.__class__.__name__
+        self._metrics = pipeline_metrics
 
 
     def add_oper(self, operation):
@@ -23,36 +35,302 @@ class Pipeline:
 
         self._operations[0].set_context(context)
 
-    def run(self, input=None):
-        prev_context = dict()
-        cur = input
+    def run(self, input=None, profiler=None):
+        lock = self._checkpoint_lock()
+        if lock is not None:
+            lock.acquire()
+        try:
+            return self._run(input, profiler)
+        finally:
+            if lock is not None:
+                lock.release()
+
+    async def arun(self, input=None):
+        lock = self._checkpoint_lock()
+        if lock is not None:
+            # Polled on the event loop, so a cancelled run never ends up holding the lock
+            await lock.aacquire()
+        try:
+            return await self._arun(input)
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def _run(self, input, profiler):
+        start_index, cur, prev_context = self._resume_point(input)
         timings = []
 
-        for operation in self._operations:
-            operation.set_context(prev_context)
-            start = time.perf_counter()
-            cur = operation.run(cur)
-            duration = time.perf_counter() - start
-            prev_context = operation.get_context()
+        try:
+            for index, operation in enumerate(self._operations[start_index:], start=start_index):
+                operation.set_context(prev_context)
+                start = time.perf_counter()
+                if profiler is None:
+                    cur = operation.run(cur)
+                else:
+                    with profiler.profile(operation.__class__.__name__):
+                        cur = operation.run(cur)
+                duration = time.perf_counter() - start
+                prev_context = operation.get_context()
+
+                timings.append(self._stage_timing(operation, duration, prev_context, cur))
+                self._save_checkpoint(index, operation, cur, prev_context)
+        except Exception:
+            self._metrics.record_run(self.__class__.__name__, timings, "failed")
+            raise
+        finally:
+            if profiler is not None:
+                # A failed dump must not hide the stage's own exception
+                try:
+                    profiler.dump(self._checkpoint_key)
+                except Exception as e:
+                    logger.error(f"Failed to write the pipeline profile for {self._checkpoint_key}: {e}")
+
+        self._clear_checkpoint()
+        self._log_summary(timings)
+        self._metrics.record_run(self.__class__.__name__, timings, "succeeded")
+
+        output = cur
+
+        return output
+
+    async def _arun(self, input):
+        start_index, cur, prev_context = self._resume_point(input)
+        timings = []
+
+        try:
+            for index, operation in enumerate(self._operations[start_index:], start=start_index):
+                operation.set_context(prev_context)
+                start = time.perf_counter()
+                cur = await operation.arun(cur)
+                duration = time.perf_counter() - start
+                prev_context = operation.get_context()
 
-            op_name = operation.__class__.__name__
-            subphases = prev_context.get(f"{op_name}_subphases")
-            timings.append((op_name, duration, subphases))
+                timings.append(self._stage_timing(operation, duration, prev_context, cur))
+                self._save_checkpoint(index, operation, cur, prev_context)
+        except Exception:
+            self._metrics.record_run(self.__class__.__name__, timings, "failed")
+            raise
 
+        self._clear_checkpoint()
         self._log_summary(timings)
+        self._metrics.record_run(self.__class__.__name__, timings, "succeeded")
 
         output = cur
 
         return output
 
+    def stream(self, input=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        context = {"chunk_size": chunk_size}
+        inclusive_durations = []
+        element_counts = []
+
+        chunks = iter([None]) if input is None else chunked(input, chunk_size)
+        for operation in self._operations:
+            operation.set_context(context)
+            inclusive_durations.append(0.0)
+            element_counts.append(0)
+            chunks = self._timed_chunks(operation.stream(chunks), inclusive_durations, element_counts, len(inclusive_durations) - 1)
+
+        try:
+            yield from chunks
+        except Exception:
+            self._metrics.record_run(self.__class__.__name__, self._stream_timings(context, inclusive_durations, element_counts), "failed")
+            raise
+
+        timings = self._stream_timings(context, inclusive_durations, element_counts)
+        self._log_summary(timings)
+        self._metrics.record_run(self.__class__.__name__, timings, "succeeded")
+
+    def _stream_timings(self, context, inclusive_durations, element_counts):
+        timings = []
+        upstream_duration = 0.0
+        for operation, inclusive_duration, elements in zip(self._operations, inclusive_durations, element_counts):
+            timing = self._stage_timing(operation, inclusive_duration - upstream_duration, context)
+            timing.elements = elements
+            timings.append(timing)
+            upstream_duration = inclusive_duration
+        return timings
+
+    def stream_staged(self, input=None, chunk_size=DEFAULT_CHUNK_SIZE, queue_size=DEFAULT_QUEUE_SIZE):
+        # Every stage runs in its own thread and hands chunks downstream through a bounded
+        # queue, so a slow stage blocks its upstream instead of letting it buffer everything.
+        context = {"chunk_size": chunk_size}
+        stop_event = threading.Event()
+        errors = []
+        start = time.perf_counter()
+
+        chunks = iter([None]) if input is None else chunked(input, chunk_size)
+        workers = []
+        for operation in self._operations:
+            operation.set_context(context)
+            output_queue = queue.Queue(maxsize=queue_size)
+            workers.append(StageWorker(operation, chunks, output_queue, stop_event, errors))
+            chunks = output_queue
+
+        for worker in workers:
+            worker.start()
+
+        status = "failed"
+        try:
+            while True:
+                try:
+                    chunk = get_chunk(chunks, stop_event)
+                except StageStopped:
+                    raise errors[0] if errors else Exception("Pipeline stages stopped unexpectedly")
+                if chunk is END_OF_STREAM:
+                    break
+                yield chunk
+            status = "succeeded"
+        finally:
+            stop_event.set()
+            for worker in workers:
+                worker.join()
+
+            timings = []
+            for operation, worker in zip(self._operations, workers):
+                timing = self._stage_timing(operation, worker.busy, context)
+                timing.elements = worker.elements
+                timing.queue = worker.stats()
+                timings.append(timing)
+            if status == "succeeded":
+                self._log_summary(timings)
+            self._metrics.record_run(self.__class__.__name__, timings, status, duration=time.perf_counter() - start)
+
+    async def astream(self, input=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        context = {"chunk_size": chunk_size}
+        start = time.perf_counter()
+
+        async def source():
+            for chunk in (iter([None]) if input is None else chunked(input, chunk_size)):
+                yield chunk
+
+        chunks = source()
+        tasks = []
+        element_counts = []
+        for operation in self._operations:
+            operation.set_context(context)
+            element_counts.append(0)
+            chunks = self._prefetched_chunks(operation.astream(chunks), tasks, element_counts, len(element_counts) - 1)
+
+        status = "failed"
+        try:
+            async for chunk in chunks:
+                yield chunk
+            status = "succeeded"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            # Stages overlap on the event loop, so only the run duration is meaningful here.
+            timings = []
+            for operation, elements in zip(self._operations, element_counts):
+                timing = self._stage_timing(operation, None, context)
+                timing.elements = elements
+                timings.append(timing)
+            self._metrics.record_run(self.__class__.__name__, timings, status, duration=time.perf_counter() - start)
+
+        logger.info(f"Async pipeline streamed {len(self._operations)} stages in {time.perf_counter() - start:.2f}s")
+
+    async def _prefetched_chunks(self, chunks, tasks, element_counts, index):
+        # Runs the stage in its own task so it works on the next chunk while downstream
+        # stages are still busy with the previous one.
+        queue = asyncio.Queue(maxsize=1)
+
+        async def produce():
+            try:
+                async for chunk in chunks:
+                    element_counts[index] += self._count_elements(chunk) or 0
+                    await queue.put(chunk)
+                await queue.put(END_OF_STREAM)
+            except Exception as e:
+                await queue.put(e)
+
+        tasks.append(asyncio.create_task(produce()))
+
+        while True:
+            chunk = await queue.get()
+            if chunk is END_OF_STREAM:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    def _timed_chunks(self, chunks, durations, element_counts, index):
+        # Stages are interleaved, so each stage's time includes pulling from upstream;
+        # stream() subtracts the upstream share when building the summary.
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                durations[index] += time.perf_counter() - start
+                return
+            durations[index] += time.perf_counter() - start
+            element_counts[index] += self._count_elements(chunk) or 0
+            yield chunk
+
+    def _stage_timing(self, operation, duration, context, output=None):
+        op_name = operation.__class__.__name__
+        return StageTiming(
+            name=op_name,
+            duration=duration,
+            subphases=context.get(f"{op_name}_subphases"),
+            elements=self._count_elements(output),
+            errors=context.get(f"{op_name}_errors") or 0
+        )
+
+    def _count_elements(self, output):
+        try:
+            return len(output)
+        except TypeError:
+            return None
+
+    def _resume_point(self, input):
+        if self._checkpoint_store is None:
+            return 0, input, dict()
+
+        checkpoint = self._checkpoint_store.load(self._checkpoint_key)
+        if checkpoint is None:
+            return 0, input, dict()
+
+        stage_index = checkpoint["stage_index"]
+        stage_names = [operation.__class__.__name__ for operation in self._operations]
+        if (stage_index >= len(stage_names) - 1 or stage_names[stage_index] != checkpoint["stage_name"]
+                or not self._operations[stage_index].checkpointed):
+            logger.warning(f"Checkpoint for {self._checkpoint_key} does not match the pipeline stages, ignoring it")
+            self._checkpoint_store.clear(self._checkpoint_key)
+            return 0, input, dict()
+
+        logger.info(f"Resuming {self._checkpoint_key} after stage {stage_index} ({checkpoint['stage_name']})")
+        return stage_index + 1, checkpoint["output"], checkpoint["context"]
+
+    def _save_checkpoint(self, index, operation, output, context):
+        # The last stage's output is the pipeline result, there is nothing left to resume. A stage that
+        # is not checkpointed leaves the previous checkpoint in place, so a resume runs it again.
+        if self._checkpoint_store is None or index >= len(self._operations) - 1 or not operation.checkpointed:
+            return
+        self._checkpoint_store.save(self._checkpoint_key, index, operation.__class__.__name__, output, context)
+
+    def _checkpoint_lock(self):
+        if self._checkpoint_store is None:
+            return None
+        return self._checkpoint_store.lock(self._checkpoint_key)
+
+    def _clear_checkpoint(self):
+        if self._checkpoint_store is not None:
+            self._checkpoint_store.clear(self._checkpoint_key)
+
     def _log_summary(self, timings):
-        total = sum(duration for _, duration, _ in timings)
+        total = sum(timing.duration for timing in timings)
         lines = ["Pipeline summary:"]
-        for name, duration, subphases in timings:
-            line = f"  {name}: {duration:.2f}s"
-            if subphases:
-                breakdown = ", ".join(f"{k}={v:.2f}s" for k, v in subphases.items())
+        for timing in timings:
+            line = f"  {timing.name}: {timing.duration:.2f}s"
+            if timing.subphases:
+                breakdown = ", ".join(f"{k}={v:.2f}s" for k, v in timing.subphases.items())
                 line += f" ({breakdown})"
+            if timing.queue:
+                line += (f" [input_wait={timing.queue['inputWait']:.2f}s, output_wait={timing.queue['outputWait']:.2f}s,"
+                         f" max_queue_depth={timing.queue['maxQueueDepth']}]")
             lines.append(line)
         lines.append(f"  Total: {total:.2f}s")
         logger.info("\n".join(lines))
@@ -0,0 +1,127 @@
+import cProfile
+import json
+import logging
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP = 25
+
+# tracemalloc is process-wide: start, stop and reset_peak from one profiled run would corrupt the
+# peak and snapshots of another, so profiled operations are measured one at a time
+_tracing_lock = threading.Lock()
+
+
+class PipelineProfiler:
+    def __init__(self, output_dir, top=DEFAULT_TOP, engines=()):
+        self._output_dir = Path(output_dir)
+        self._top = top
+        self._engines = list(engines)
+        self._operations = []
+
+    @contextmanager
+    def profile(self, op_name):
+        with _tracing_lock:
+            with self._profile(op_name):
+                yield
+
+    @contextmanager
+    def _profile(self, op_name):
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+
+        sql_statements = [0]
+        thread_id = threading.get_ident()
+
+        def count_statement(*args, **kwargs):
+            # The engines are shared with concurrent requests, so only count this thread's statements,
+            # the same thread cProfile sees
+            if threading.get_ident() == thread_id:
+                sql_statements[0] += 1
+
+        for engine in self._engines:
+            self._listen(engine, count_statement)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+
+            for engine in self._engines:
+                self._remove(engine, count_statement)
+
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            self._operations.append({
+                "operation": op_name,
+                "duration": duration,
+                "sqlStatements": sql_statements[0] if self._engines else None,
+                "peakTracedMb": peak / (1024 * 1024),
+                "topFunctions": self._top_functions(profiler),
+                "topAllocations": self._top_allocations(before, after),
+            })
+
+    def dump(self, pipeline_name):
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        started_at = datetime.now(timezone.utc)
+        file_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{pipeline_name}_{started_at:%Y%m%dT%H%M%S%f}")
+        path = self._output_dir / f"{file_name}.json"
+
+        report = {
+            "pipeline": pipeline_name,
+            "createdAt": started_at.isoformat(),
+            "operations": self._operations,
+        }
+        with open(path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+        logger.info(f"Pipeline profile written to {path}")
+        self._operations = []
+        return path
+
+    def _top_functions(self, profiler):
+        stats = pstats.Stats(profiler)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self._top]
+        return [
+            {
+                "function": f"{file_name}:{line}({function})",
+                "calls": calls,
+                "totalTime": total_time,
+                "cumulativeTime": cumulative_time,
+            }
+            for (file_name, line, function), (_, calls, total_time, cumulative_time, _) in rows
+        ]
+
+    def _top_allocations(self, before, after):
+        return [
+            {
+                "location": str(stat.traceback),
+                "sizeDiffKb": stat.size_diff / 1024,
+                "countDiff": stat.count_diff,
+            }
+            for stat in after.compare_to(before, "lineno")[:self._top]
+        ]
+
+    def _listen(self, engine, handler):
+        event.listen(engine, "before_cursor_execute", handler)
+
+    def _remove(self, engine, handler):
+        event.remove(engine, "before_cursor_execute", handler)
@@ -0,0 +1,108 @@
+import queue
+import threading
+import time
+
+POLL_INTERVAL = 0.1
+
+END_OF_STREAM = object()
+
+
+class StageStopped(Exception):
+    pass
+
+
+class StageWorker(threading.Thread):
+    def __init__(self, operation, input_chunks, output_queue, stop_event, errors):
+        super().__init__(name=f"stage-{operation.__class__.__name__}", daemon=True)
+        self._operation = operation
+        self._input_chunks = input_chunks
+        self._output_queue = output_queue
+        self._stop_event = stop_event
+        self._errors = errors
+
+        self.busy = 0.0
+        self.input_wait = 0.0
+        self.output_wait = 0.0
+        self.chunks = 0
+        self.elements = 0
+        self.max_queue_depth = 0
+        self._queue_depth_total = 0
+
+    def run(self):
+        try:
+            chunks = self._operation.stream(self._pull())
+            while True:
+                start = time.perf_counter()
+                input_wait_before = self.input_wait
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    self.busy += time.perf_counter() - start - (self.input_wait - input_wait_before)
+                    break
+                self.busy += time.perf_counter() - start - (self.input_wait - input_wait_before)
+
+                self.chunks += 1
+                try:
+                    self.elements += len(chunk)
+                except TypeError:
+                    pass
+                self._push(chunk)
+
+            self._push(END_OF_STREAM)
+        except StageStopped:
+            return
+        except Exception as e:
+            self._errors.append(e)
+            self._stop_event.set()
+
+    def stats(self):
+        return {
+            "busy": self.busy,
+            "inputWait": self.input_wait,
+            "outputWait": self.output_wait,
+            "chunks": self.chunks,
+            "elements": self.elements,
+            "throughput": self.elements / self.busy if self.busy > 0 else None,
+            "maxQueueDepth": self.max_queue_depth,
+            "meanQueueDepth": self._queue_depth_total / self.chunks if self.chunks else 0.0,
+        }
+
+    def _pull(self):
+        if not isinstance(self._input_chunks, queue.Queue):
+            yield from self._input_chunks
+            return
+
+        while True:
+            start = time.perf_counter()
+            chunk = get_chunk(self._input_chunks, self._stop_event)
+            self.input_wait += time.perf_counter() - start
+            if chunk is END_OF_STREAM:
+                return
+            yield chunk
+
+    def _push(self, chunk):
+        if chunk is not END_OF_STREAM:
+            depth = self._output_queue.qsize()
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            self._queue_depth_total += depth
+
+        start = time.perf_counter()
+        while True:
+            if self._stop_event.is_set():
+                raise StageStopped()
+            try:
+                self._output_queue.put(chunk, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                continue
+        self.output_wait += time.perf_counter() - start
+
+
+def get_chunk(chunk_queue, stop_event):
+    while True:
+        if stop_event.is_set():
+            raise StageStopped()
+        try:
+            return chunk_queue.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            continue
@@ -0,0 +1,130 @@
+# Checks that Pipeline.run resumes from the checkpoint of a failed run, that CheckpointStore drops
+# expired and unreadable checkpoints, and that CheckpointLock gives up after its timeout.
+import asyncio
+import pickle
+import time
+import pytest
+from pipeline.checkpoint import CheckpointStore
+from pipeline.operation import Operation
+from pipeline.pipeline import Pipeline
+
+KEY = "rental-listing"
+
+
+class _Append(Operation):
+    def __init__(self, name, calls, fail=False):
+        super().__init__()
+        self._name = name
+        self._calls = calls
+        self.fail = fail
+
+    def run(self, input=None):
+        self._calls.append(self._name)
+        if self.fail:
+            raise RuntimeError(f"{self._name} failed")
+        self.set_context_value(f"{self._name}_done", True)
+        return (input or []) + [self._name]
+
+
+def _pipeline(store, calls, fail_at=None):
+    pipeline = Pipeline(checkpoint_store=store, checkpoint_key=KEY)
+    for name in ("fetch", "transform", "write"):
+        pipeline.add_oper(_Append(name, calls, fail=name == fail_at))
+    return pipeline
+
+
+def test_a_failed_run_resumes_after_the_last_completed_stage(tmp_path):
+    store = CheckpointStore(tmp_path)
+    calls = []
+
+    with pytest.raises(RuntimeError):
+        _pipeline(store, calls, fail_at="write").run()
+    checkpoint = store.load(KEY)
+    assert checkpoint["stage_name"] == "_Append"
+    assert checkpoint["stage_index"] == 1
+    assert checkpoint["output"] == ["fetch", "transform"]
+    assert checkpoint["context"]["transform_done"] is True
+
+    calls.clear()
+    assert _pipeline(store, calls).run() == ["fetch", "transform", "write"]
+    assert calls == ["write"]
+    assert store.load(KEY) is None
+
+
+def test_a_checkpoint_that_does_not_match_the_stages_is_ignored(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.save(KEY, 0, "SomeOtherOper", ["stale"], {})
+    calls = []
+
+    assert _pipeline(store, calls).run() == ["fetch", "transform", "write"]
+    assert calls == ["fetch", "transform", "write"]
+
+
+def test_expired_checkpoints_are_discarded(tmp_path):
+    store = CheckpointStore(tmp_path, max_age=60)
+    store.save(KEY, 0, "_Append", ["fetch"], {})
+    assert store.load(KEY)["output"] == ["fetch"]
+
+    path = store._path(KEY)
+    with open(path, "rb") as checkpoint_file:
+        checkpoint = pickle.load(checkpoint_file)
+    checkpoint["created_at"] = time.time() - 61
+    with open(path, "wb") as checkpoint_file:
+        pickle.dump(checkpoint, checkpoint_file)
+
+    assert store.load(KEY) is None
+    assert not path.exists()
+
+
+def test_unreadable_checkpoints_are_discarded(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.save(KEY, 0, "_Append", ["fetch"], {})
+    store._path(KEY).write_bytes(b"not a pickle")
+
+    assert store.load(KEY) is None
+    assert not store._path(KEY).exists()
+
+
+def test_unpicklable_context_values_are_left_out(tmp_path):
+    store = CheckpointStore(tmp_path)
+    store.save(KEY, 0, "_Append", [], {"session": lambda: None, "chunk_size": 10})
+
+    assert store.load(KEY)["context"] == {"chunk_size": 10}
+
+
+def test_the_lock_times_out_while_another_run_holds_it(tmp_path):
+    store = CheckpointStore(tmp_path, lock_timeout=0.2)
+    with store.lock(KEY):
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            store.lock(KEY).acquire()
+        assert time.monotonic() - start >= 0.2
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(store.lock(KEY).aacquire())
+
+    lock = store.lock(KEY)
+    assert lock.try_acquire() is True
+    lock.release()
+
+
+def test_a_cancelled_async_waiter_never_takes_the_lock(tmp_path):
+    store = CheckpointStore(tmp_path)
+    holder = store.lock(KEY)
+    holder.acquire()
+    waiter = store.lock(KEY)
+
+    async def wait_and_cancel():
+        task = asyncio.create_task(waiter.aacquire())
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(wait_and_cancel())
+    holder.release()
+
+    assert waiter._file is None
+    lock = store.lock(KEY)
+    assert lock.try_acquire() is True
+    lock.release()
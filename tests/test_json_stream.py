@@ -0,0 +1,97 @@
+# Checks that the incremental JSON array parser yields the same listings as json.loads however the
+# response body is split into chunks, and that it rejects bodies that are not one complete array.
+import asyncio
+import json
+import pytest
+from pipeline.json_stream import JsonArrayParser, aiter_json_array, iter_json_array, iter_json_file
+
+LISTINGS = [
+    {"id": "1, Main St [A]", "price": 1250, "history": {"2024-01-01": {"event": "Rental Listing"}}},
+    {"id": "Café \"Ñandú\" – 東京", "price": 99.5, "hoa": None, "active": True},
+    12345678901234567890,
+    -0.25e-3,
+    "plain string with \\ and é",
+    [],
+    {},
+]
+
+
+def _split(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_every_split_point_gives_the_same_listings(indent):
+    body = json.dumps(LISTINGS, ensure_ascii=False, indent=indent).encode("utf-8")
+
+    for split in range(1, len(body)):
+        assert list(iter_json_array([body[:split], body[split:]])) == LISTINGS, f"split at byte {split}"
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_small_chunks_give_the_same_listings(size):
+    body = json.dumps(LISTINGS, ensure_ascii=False).encode("utf-8")
+
+    assert list(iter_json_array(_split(body, size))) == LISTINGS
+
+
+def test_a_number_split_across_chunks_is_not_cut_short():
+    parser = JsonArrayParser()
+
+    assert parser.feed(b"[12") == []
+    assert parser.feed(b"34, 5") == [1234]
+    assert parser.feed(b"6, 1.") == [56]
+    assert parser.feed(b"5e") == []
+    assert parser.feed(b"-2]") == [0.015]
+    assert parser.close() == []
+
+
+def test_listings_are_yielded_as_soon_as_they_are_complete():
+    parser = JsonArrayParser()
+
+    assert parser.feed(b'[{"id": 1}, {"id"') == [{"id": 1}]
+    assert parser.feed(b': 2}') == [{"id": 2}]
+    assert parser.feed(b"]") == []
+    assert parser.close() == []
+
+
+@pytest.mark.parametrize("body", [b"[]", b"  [ ]  ", b"\n[\n]\n"])
+def test_empty_arrays(body):
+    assert list(iter_json_array(_split(body, 1))) == []
+
+
+@pytest.mark.parametrize("body, message", [
+    (b'{"id": 1}', "Expected a JSON array"),
+    (b'[{"id": 1}', "Incomplete JSON array"),
+    (b'[{"id": 1},', "Incomplete JSON array"),
+    (b'[{"id": 1} {"id": 2}]', "Expected ',' or ']'"),
+    (b'[1] [2]', "Unexpected data after the JSON array"),
+])
+def test_malformed_bodies_are_rejected(body, message):
+    with pytest.raises(ValueError, match=message):
+        list(iter_json_array(_split(body, 3)))
+
+
+def test_a_truncated_value_is_rejected():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array([b'[{"id": "unterminated']))
+
+
+def test_async_chunks_give_the_same_listings():
+    body = json.dumps(LISTINGS, ensure_ascii=False).encode("utf-8")
+
+    async def chunks():
+        for chunk in _split(body, 5):
+            yield chunk
+
+    async def collect():
+        return [listing async for listing in aiter_json_array(chunks())]
+
+    assert asyncio.run(collect()) == LISTINGS
+
+
+def test_files_are_read_in_chunks(tmp_path):
+    path = tmp_path / "listings.json"
+    path.write_text(json.dumps(LISTINGS, ensure_ascii=False), encoding="utf-8")
+
+    assert list(iter_json_file(path, read_size=4)) == LISTINGS
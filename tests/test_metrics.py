@@ -0,0 +1,95 @@
+# Checks the percentiles MetricsStore.summary computes over its window of recent runs and the
+# Prometheus text it renders from its cumulative counters and histograms.
+from pipeline.metrics import MetricsStore, StageTiming
+
+
+def _record(store, duration, status="succeeded", subphases=None, elements=10, errors=0):
+    stage = StageTiming(name="FetchOper", duration=duration, subphases=subphases, elements=elements, errors=errors)
+    return store.record_run("Pipeline", [stage], status)
+
+
+def _operation(summary, phase):
+    return next(operation for operation in summary["operations"] if operation["phase"] == phase)
+
+
+def test_percentiles_use_the_nearest_rank():
+    store = MetricsStore()
+    for duration in range(100, 0, -1):
+        _record(store, float(duration))
+
+    duration = store.summary()["pipelines"][0]["duration"]
+    assert duration == {"count": 100, "mean": 50.5, "max": 100.0, "p50": 50.0, "p90": 90.0, "p99": 99.0}
+
+
+def test_percentiles_of_a_single_run_are_that_run():
+    store = MetricsStore()
+    _record(store, 2.0)
+
+    duration = store.summary()["pipelines"][0]["duration"]
+    assert duration["p50"] == duration["p99"] == duration["max"] == 2.0
+
+
+def test_summary_only_covers_the_window_of_recent_runs():
+    store = MetricsStore(max_runs=3)
+    for duration in (100.0, 1.0, 2.0, 3.0):
+        _record(store, duration)
+
+    summary = store.summary()
+    assert summary["windowRuns"] == 3
+    assert summary["pipelines"][0]["duration"]["max"] == 3.0
+    assert [run.duration for run in store.runs(2)] == [2.0, 3.0]
+
+
+def test_summary_breaks_operations_down_by_phase():
+    store = MetricsStore()
+    _record(store, 1.0, subphases={"request": 0.75}, elements=10, errors=1)
+    _record(store, 3.0, status="failed", subphases={"request": 2.5}, elements=5, errors=2)
+
+    summary = store.summary()
+    assert summary["pipelines"][0]["statuses"] == {"succeeded": 1, "failed": 1}
+
+    total = _operation(summary, "total")
+    assert total["duration"]["count"] == 2
+    assert (total["elements"], total["errors"]) == (15, 3)
+
+    request = _operation(summary, "request")
+    assert request["duration"]["max"] == 2.5
+    assert request["elements"] is None and request["errors"] is None
+
+
+def test_empty_store_renders_nothing():
+    store = MetricsStore()
+
+    assert store.summary() == {"windowRuns": 0, "pipelines": [], "operations": []}
+    assert store.to_prometheus() == "\n"
+
+
+def test_prometheus_histograms_are_cumulative():
+    store = MetricsStore()
+    for duration in (0.01, 0.3, 7.0):
+        _record(store, duration)
+
+    lines = store.to_prometheus().splitlines()
+    assert "# TYPE pipeline_run_duration_seconds histogram" in lines
+    assert 'pipeline_run_duration_seconds_bucket{pipeline="Pipeline",le="0.05"} 1' in lines
+    assert 'pipeline_run_duration_seconds_bucket{pipeline="Pipeline",le="0.5"} 2' in lines
+    assert 'pipeline_run_duration_seconds_bucket{pipeline="Pipeline",le="5.0"} 2' in lines
+    assert 'pipeline_run_duration_seconds_bucket{pipeline="Pipeline",le="10.0"} 3' in lines
+    assert 'pipeline_run_duration_seconds_bucket{pipeline="Pipeline",le="+Inf"} 3' in lines
+    assert 'pipeline_run_duration_seconds_count{pipeline="Pipeline"} 3' in lines
+    sum_line = next(line for line in lines if line.startswith("pipeline_run_duration_seconds_sum"))
+    assert abs(float(sum_line.split()[-1]) - 7.31) < 1e-9
+
+
+def test_prometheus_counters_outlive_the_window():
+    store = MetricsStore(max_runs=1)
+    _record(store, 1.0, elements=10, errors=1)
+    _record(store, 1.0, status="failed", elements=5, errors=2)
+
+    lines = store.to_prometheus().splitlines()
+    assert "# TYPE pipeline_runs_total counter" in lines
+    assert 'pipeline_runs_total{pipeline="Pipeline",status="succeeded"} 1.0' in lines
+    assert 'pipeline_runs_total{pipeline="Pipeline",status="failed"} 1.0' in lines
+    assert 'pipeline_operation_elements_total{pipeline="Pipeline",operation="FetchOper"} 15.0' in lines
+    assert 'pipeline_operation_errors_total{pipeline="Pipeline",operation="FetchOper"} 3.0' in lines
+    assert 'pipeline_operation_duration_seconds_count{pipeline="Pipeline",operation="FetchOper",phase="total"} 2' in lines
@@ -0,0 +1,171 @@
+# Checks the state transitions of the RentCast client's adaptive token bucket and circuit breaker, and
+# that its retries report how many requests RentCast answered, since every answered request is billed.
+import pytest
+import requests
+from fusion.rental_listing import rentcast_client as client_module
+from fusion.rental_listing.rentcast_client import CircuitBreaker, CircuitOpenError, RentcastClient, TokenBucket
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _Session:
+    def __init__(self, outcomes):
+        self._outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        outcome = self._outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(client_module.time, "monotonic", clock)
+    return clock
+
+
+def _client(outcomes, **kwargs):
+    options = dict(rate=1000, burst=1000, max_retries=3, backoff_base=0, backoff_max=0, failure_threshold=100)
+    options.update(kwargs)
+    client = RentcastClient(**options)
+    session = _Session(outcomes)
+    client._get_session = lambda: session
+    return client, session
+
+
+def test_the_bucket_allows_a_burst_then_paces_requests(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock.now += 10
+    assert bucket.reserve() == 0.0
+
+
+def test_throttling_halves_the_rate_down_to_the_floor_and_recovers_gradually(clock):
+    bucket = TokenBucket(rate=16, burst=1, min_rate=3)
+
+    bucket.throttle()
+    assert bucket.rate == 8
+    bucket.throttle()
+    bucket.throttle()
+    assert bucket.rate == 3
+
+    bucket.recover()
+    assert bucket.rate == pytest.approx(4.6)
+    for _ in range(20):
+        bucket.recover()
+    assert bucket.rate == 16
+
+
+def test_the_circuit_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.opens == 1
+    with pytest.raises(CircuitOpenError, match="retry in 60s"):
+        breaker.before_request()
+    assert breaker.rejections == 1
+
+
+def test_a_half_open_circuit_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+
+    clock.now += 60
+    assert breaker.state == "half_open"
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+
+def test_a_failed_trial_opens_the_circuit_again(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    clock.now += 60
+    breaker.before_request()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.opens == 2
+
+    clock.now += 59
+    assert breaker.state == "open"
+    clock.now += 1
+    assert breaker.state == "half_open"
+
+
+def test_retried_responses_are_counted_as_answered():
+    client, session = _client([_Response(500), _Response(429, {"Retry-After": "0"}), _Response(200)])
+
+    response, answered = client.get("https://rentcast.test/listings")
+
+    assert response.status_code == 200
+    assert answered == 3
+    stats = client.stats()
+    assert (stats["requests"], stats["retries"], stats["failures"], stats["throttled"]) == (3, 2, 2, 1)
+
+
+def test_the_last_retryable_response_is_returned_once_retries_run_out():
+    client, session = _client([_Response(503) for _ in range(4)])
+
+    response, answered = client.get("https://rentcast.test/listings")
+
+    assert response.status_code == 503
+    assert answered == 4
+    assert session.calls == 4
+
+
+def test_errors_carry_the_answered_requests_before_them():
+    client, _ = _client(
+        [_Response(502), requests.ConnectionError("reset"), _Response(429), requests.ConnectionError("reset")]
+    )
+
+    with pytest.raises(requests.ConnectionError) as error:
+        client.get("https://rentcast.test/listings")
+
+    assert error.value.answered == 2
+
+
+def test_an_open_circuit_stops_the_retries(clock):
+    client, session = _client([_Response(500) for _ in range(4)], failure_threshold=2)
+
+    with pytest.raises(CircuitOpenError) as error:
+        client.get("https://rentcast.test/listings")
+
+    assert error.value.answered == 2
+    assert session.calls == 2
@@ -0,0 +1,74 @@
+# Checks the calls and offsets settle_reservation hands back to rentcast_stats once a run's pages are
+# in. The statements themselves are replaced by a recorder, so no database is needed.
+import datetime
+import logging
+import pytest
+from fusion.rental_listing import rentcast_quota
+from fusion.rental_listing.rentcast_quota import SETTLE_RESERVATION_QUERY, reserve_pages, settle_reservation
+
+RESERVATION = {
+    "pages": 4,
+    "start_offset": 1000,
+    "limit_value": 500,
+    "next_payment_date": datetime.date(2026, 11, 1),
+    "api_calls_number": 40,
+}
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    executed = []
+
+    def execute_returning(query, params=None):
+        executed.append((query, params))
+        if query == SETTLE_RESERVATION_QUERY:
+            return {"offset_value": params["ingested_end"], "api_calls_number": 0}
+        return None
+
+    monkeypatch.setattr(rentcast_quota, "execute_returning", execute_returning)
+    return executed
+
+
+def test_a_fully_used_reservation_is_not_settled(statements):
+    settle_reservation(RESERVATION, calls=4, advanced_pages=4)
+
+    assert statements == []
+
+
+def test_unused_calls_and_offsets_are_handed_back(statements):
+    settle_reservation(RESERVATION, calls=3, advanced_pages=2)
+
+    [(query, params)] = statements
+    assert query == SETTLE_RESERVATION_QUERY
+    assert params == {
+        "id": rentcast_quota.RENTCAST_STATS_ID,
+        "next_payment_date": RESERVATION["next_payment_date"],
+        "unused_calls": 1,
+        "reserved_end": 3000,
+        "ingested_end": 2000,
+    }
+
+
+def test_retries_beyond_the_reservation_are_charged(statements):
+    settle_reservation(RESERVATION, calls=7, advanced_pages=4)
+
+    [(_, params)] = statements
+    assert params["unused_calls"] == -3
+    assert params["reserved_end"] == params["ingested_end"] == 3000
+
+
+def test_offsets_another_run_reserved_past_are_reported(monkeypatch, caplog):
+    monkeypatch.setattr(
+        rentcast_quota, "execute_returning", lambda query, params=None: {"offset_value": 5000, "api_calls_number": 0}
+    )
+
+    with caplog.at_level(logging.WARNING, logger=rentcast_quota.__name__):
+        settle_reservation(RESERVATION, calls=4, advanced_pages=1)
+
+    assert "Offsets 1500-3000 were not ingested" in caplog.text
+
+
+def test_reserving_without_a_stats_row_fails(statements):
+    with pytest.raises(Exception, match="rentcast_stats row 1 not found"):
+        reserve_pages(2)
+    assert statements[0][1] == {"pages": 2, "id": rentcast_quota.RENTCAST_STATS_ID}
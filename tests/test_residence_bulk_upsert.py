@@ -0,0 +1,117 @@
+# Checks that the set-based write paths (ResidenceRepository.bulk_upsert and copy_upsert) store the same
+# residences as the per-residence ORM path. Needs the Postgres database configured in .env, migrated to
+# head; the module is skipped when it cannot connect.
+import pytest
+
+try:
+    from sqlalchemy import text
+    from sqlmodel import Session, select
+    from db.session import engine
+    from benchmarks.ingestion_benchmark import ListingGenerator, run_chain, cleanup
+    from entities.home_doc.models import HomeDoc
+    from entities.residence.models import Listing
+    from entities.residence.repository import ResidenceRepository
+    from entities.residence.service import ResidenceService
+    from fusion.rental_listing.fusion_oper import FusionOper
+    from fusion.rental_listing.transformation import PropertyListing
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+except Exception as e:
+    pytest.skip(f"Postgres is not available: {e}", allow_module_level=True)
+
+RUN_TAG = "bulk-upsert-test"
+GENERATED_FIELDS = {"id", "created_at", "updated_at", "residence_id", "home_doc_id"}
+
+WRITE_PATHS = {
+    "orm": {"bulk": False},
+    "bulk": {"bulk": True, "copy_threshold": 0},
+    "copy": {"bulk": True, "copy_threshold": 1},
+}
+
+
+def _stored_residences():
+    repository = ResidenceRepository.get_instance()
+    service = ResidenceService.get_instance(repository)
+    with Session(engine) as session:
+        ids = session.exec(select(HomeDoc.id).where(HomeDoc.external_id.like(f"bench-{RUN_TAG}-%"))).all()
+        home_docs = repository.get_by_ids(ids, session)
+        residences = [service.to_response(home_doc).model_dump() for home_doc in home_docs.values()]
+    return {residence["external_id"]: _without_generated_fields(residence) for residence in residences}
+
+
+def _without_generated_fields(value):
+    if isinstance(value, dict):
+        return {key: _without_generated_fields(item) for key, item in value.items() if key not in GENERATED_FIELDS}
+    if isinstance(value, list):
+        return sorted((_without_generated_fields(item) for item in value), key=repr)
+    return value
+
+
+def _write_twice(write_path):
+    # Creates half of the listings, then sends changed versions of those along with the other half
+    generator = ListingGenerator(contact_ratio=0.7, contacts_pool=5, seed=1)
+    listings = generator.generate(40, RUN_TAG)
+    cleanup(RUN_TAG)
+    try:
+        run_chain(listings[:20], **WRITE_PATHS[write_path])
+        created = _stored_residences()
+        run_chain(generator.mutate(listings[:20], RUN_TAG) + listings[20:], **WRITE_PATHS[write_path])
+        updated = _stored_residences()
+    finally:
+        cleanup(RUN_TAG)
+    return created, updated
+
+
+@pytest.fixture(scope="module")
+def orm_residences():
+    return _write_twice("orm")
+
+
+@pytest.mark.parametrize("write_path", ["bulk", "copy"])
+def test_set_based_writes_match_the_orm_path(orm_residences, write_path):
+    orm_created, orm_updated = orm_residences
+    created, updated = _write_twice(write_path)
+
+    assert created == orm_created
+    assert updated.keys() == orm_updated.keys()
+    for external_id, residence in updated.items():
+        # The ORM path appends the incoming history on update; the set-based paths replace it
+        expected = dict(orm_updated[external_id], listing_history=residence["listing_history"])
+        assert residence == expected
+        assert len(residence["listing_history"]) <= len(orm_updated[external_id]["listing_history"])
+
+
+@pytest.mark.parametrize("write_path", ["bulk", "copy"])
+def test_set_based_writes_leave_other_home_doc_types_alone(write_path):
+    generator = ListingGenerator(seed=2)
+    listing = PropertyListing.model_validate(generator.generate(1, RUN_TAG)[0])
+    row = FusionOper().property_listing_to_create_row(listing)
+    repository = ResidenceRepository.get_instance()
+
+    cleanup(RUN_TAG)
+    try:
+        with Session(engine) as session:
+            room_stuff = HomeDoc(
+                external_id=row["external_id"],
+                interior_entity_key=f"{row['interior_entity_key']}-stuff",
+                category=row["category"],
+                type="ROOM_STUFF",
+                description="not a residence",
+                extra_data=[],
+            )
+            session.add(room_stuff)
+            session.commit()
+            room_stuff_id = room_stuff.id
+
+            upsert = repository.copy_upsert if write_path == "copy" else repository.bulk_upsert
+            assert upsert([(None, row)], session) == [None]
+            session.commit()
+
+            stored = session.get(HomeDoc, room_stuff_id)
+            session.refresh(stored)
+            assert stored.description == "not a residence"
+            assert session.exec(select(Listing).where(Listing.residence_id == room_stuff_id)).first() is None
+            assert repository.get_by_ids([room_stuff_id], session) == {}
+    finally:
+        cleanup(RUN_TAG)
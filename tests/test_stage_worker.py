@@ -0,0 +1,100 @@
+# Checks that Pipeline.stream_staged passes chunks through its stage workers in order, surfaces the
+# original exception of a failing stage, and stops every worker when the run fails or is abandoned.
+import threading
+import time
+import pytest
+from pipeline.metrics import MetricsStore
+from pipeline.operation import Operation
+from pipeline.pipeline import Pipeline
+
+
+class _Double(Operation):
+    def run(self, input=None):
+        return [value * 2 for value in input]
+
+
+class _FailAt(Operation):
+    def __init__(self, value):
+        super().__init__()
+        self._value = value
+
+    def run(self, input=None):
+        if self._value in input:
+            raise KeyError(self._value)
+        return input
+
+
+class _Slow(Operation):
+    def run(self, input=None):
+        time.sleep(0.05)
+        return input
+
+
+def _pipeline(*operations):
+    pipeline = Pipeline()
+    pipeline._metrics = MetricsStore()
+    for operation in operations:
+        pipeline.add_oper(operation)
+    return pipeline
+
+
+def _stage_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("stage-") and thread.is_alive()]
+
+
+def test_chunks_come_out_in_order():
+    pipeline = _pipeline(_Double(), _Double())
+
+    chunks = list(pipeline.stream_staged(range(10), chunk_size=3, queue_size=1))
+
+    assert chunks == [[0, 4, 8], [12, 16, 20], [24, 28, 32], [36]]
+    run = pipeline._metrics.runs()[-1]
+    assert run.status == "succeeded"
+    assert [stage.elements for stage in run.stages] == [10, 10]
+
+
+def test_a_failing_stage_raises_its_own_exception_and_stops_the_others():
+    pipeline = _pipeline(_Double(), _FailAt(8), _Slow())
+
+    received = []
+    with pytest.raises(KeyError) as error:
+        for chunk in pipeline.stream_staged(range(100), chunk_size=2, queue_size=1):
+            received.append(chunk)
+
+    assert error.value.args == (8,)
+    # Whatever got through before the failure is a prefix of the output
+    assert received == [[0, 2], [4, 6]][:len(received)]
+    assert _stage_threads() == []
+    assert pipeline._metrics.runs()[-1].status == "failed"
+
+
+def test_a_failing_source_is_raised_to_the_consumer():
+    def listings():
+        yield 1
+        raise ConnectionError("page 2 failed")
+
+    pipeline = _pipeline(_Double())
+
+    with pytest.raises(ConnectionError, match="page 2 failed"):
+        list(pipeline.stream_staged(listings(), chunk_size=1, queue_size=1))
+    assert _stage_threads() == []
+
+
+def test_an_abandoned_run_stops_its_workers():
+    pipeline = _pipeline(_Double(), _Slow())
+
+    chunks = pipeline.stream_staged(range(1000), chunk_size=1, queue_size=1)
+    assert next(chunks) == [0]
+    chunks.close()
+
+    assert _stage_threads() == []
+    assert pipeline._metrics.runs()[-1].status == "failed"
+
+
+def test_queues_stay_within_their_size():
+    pipeline = _pipeline(_Double(), _Slow())
+
+    list(pipeline.stream_staged(range(20), chunk_size=1, queue_size=2))
+
+    for stage in pipeline._metrics.runs()[-1].stages:
+        assert stage.queue["maxQueueDepth"] <= 2